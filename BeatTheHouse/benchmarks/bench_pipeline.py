@@ -0,0 +1,185 @@
+# bench_pipeline.py
+
+"""Times and memory-profiles the odds pipeline on synthetic payloads.
+
+Each stage (prepare_fixture_data, prepare_odds_data, recommend_bets and
+display_current_odds_df) runs on payloads of 10x, 100x and 1000x a single
+league by default. Timings are the best and median of --repeat runs; peak
+memory is measured in a separate tracemalloc run so it does not distort the
+timings. Payloads are generated from a fixed seed, so results are
+comparable across commits.
+
+Examples:
+    python benchmarks/bench_pipeline.py --output baseline.json
+    python benchmarks/bench_pipeline.py --scales 10 100 --compare baseline.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'src'))
+
+from synthetic_odds import DEFAULT_BOOKMAKERS, LEAGUE_EVENTS, generate_payload  # noqa: E402
+
+DEFAULT_SCALES = [10, 100, 1000]
+DEFAULT_THRESHOLD = 0.2
+
+
+def _stages(core, events, funds=100.0, max_bets=10):
+    """Returns (name, callable) pairs for every benchmarked stage.
+
+    The setup only uses the long-standing prepare_* entry points, so the
+    harness also runs against commits that predate normalize_events.
+    """
+    X_fix, O_fix = core.prepare_fixture_data(events), core.prepare_odds_data(events)
+    return [
+        ('prepare_fixture_data', lambda: core.prepare_fixture_data(events)),
+        ('prepare_odds_data', lambda: core.prepare_odds_data(events)),
+        ('recommend_bets', lambda: core.recommend_bets(X_fix, O_fix, funds, max_bets)),
+        ('display_current_odds_df', lambda: core.display_current_odds_df(X_fix, O_fix)),
+    ], len(O_fix)
+
+
+def _time(func, repeat):
+    """Returns the wall-clock seconds of repeat calls to func, with garbage collection paused."""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return times
+
+
+def _peak_memory(func):
+    """Returns the peak traced memory in MB allocated while func runs."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def _git_commit():
+    """Returns the current git commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales, n_bookmakers, markets, repeat, seed=0):
+    """Runs every stage at every scale and returns the result records."""
+    import main as core
+
+    results = []
+    for scale in scales:
+        events = generate_payload(scale, n_bookmakers, markets, seed=seed)
+        stages, rows = _stages(core, events)
+        for name, func in stages:
+            func()  # warm-up
+            times = _time(func, repeat)
+            record = {
+                'stage': name,
+                'scale': scale,
+                'events': len(events),
+                'odds_rows': rows,
+                'best_s': min(times),
+                'median_s': statistics.median(times),
+                'peak_mb': _peak_memory(func),
+            }
+            results.append(record)
+            print(f"{name:<24} x{scale:<5} {record['best_s'] * 1000:10.1f} ms best "
+                  f"{record['median_s'] * 1000:10.1f} ms median {record['peak_mb']:9.1f} MB peak", flush=True)
+        del events, stages
+    return results
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Prints each stage's change against a baseline and returns the regressed (stage, scale) pairs.
+
+    A stage regresses when its best time or peak memory grows by more than
+    threshold (a fraction) over the baseline.
+    """
+    previous = {(r['stage'], r['scale']): r for r in baseline['results']}
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'}:")
+    for record in results:
+        before = previous.get((record['stage'], record['scale']))
+        if before is None:
+            continue
+        time_ratio = record['best_s'] / before['best_s'] if before['best_s'] else 1.0
+        memory_ratio = record['peak_mb'] / before['peak_mb'] if before['peak_mb'] else 1.0
+        regressed = time_ratio > 1 + threshold or memory_ratio > 1 + threshold
+        if regressed:
+            regressions.append((record['stage'], record['scale']))
+        print(f"{record['stage']:<24} x{record['scale']:<5} time {time_ratio:6.2f}x  memory {memory_ratio:6.2f}x"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv=None):
+    """Runs the benchmarks and returns a process exit code (1 when a regression is found)."""
+    parser = argparse.ArgumentParser(description="Benchmark the odds pipeline on synthetic payloads.")
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES,
+                        help=f"Payload sizes in leagues of {LEAGUE_EVENTS} events (default 10 100 1000)")
+    parser.add_argument('--bookmakers', type=int, default=DEFAULT_BOOKMAKERS, help="Bookmakers per event")
+    parser.add_argument('--markets', default='h2h', help="Comma-separated markets: h2h, spreads, totals")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per stage (default 5)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON file from an earlier --output run")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown or memory growth as a fraction (default 0.2)")
+    args = parser.parse_args(argv)
+
+    import numpy as np
+    import pandas as pd
+
+    markets = tuple(market for market in args.markets.split(',') if market)
+    results = run(args.scales, args.bookmakers, markets, args.repeat, seed=args.seed)
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'bookmakers': args.bookmakers,
+            'markets': list(markets),
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+# synthetic_odds.py
+
+"""Generator of realistic synthetic Odds API payloads.
+
+The payloads follow the /v4/sports/{sport}/odds response: a list of events,
+each with bookmakers quoting decimal prices for h2h, spreads, totals or
+outrights markets. Prices come from a per-game true probability plus a
+per-bookmaker margin and noise, so the data exercises the same code paths
+(partial bookmaker coverage, missing draws, differing spread lines) as live
+responses. Output is fully determined by the seed.
+"""
+
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+# Events in one typical league response (about two rounds of a 20-team league)
+LEAGUE_EVENTS = 20
+DEFAULT_BOOKMAKERS = 30
+BOOKMAKER_KEYS = [
+    'betfair_ex_uk', 'betfair_sb_uk', 'betmgm', 'betonlineag', 'betrivers', 'betsson', 'betus', 'betvictor',
+    'betway', 'bovada', 'boylesports', 'casumo', 'coral', 'draftkings', 'fanduel', 'grosvenor', 'ladbrokes_uk',
+    'leovegas', 'livescorebet', 'lowvig', 'marathonbet', 'matchbook', 'mybookieag', 'nordicbet', 'onexbet',
+    'paddypower', 'pinnacle', 'skybet', 'sport888', 'suprabets', 'tipico_de', 'unibet_eu', 'unibet_uk',
+    'virginbet', 'williamhill', 'williamhill_us',
+]
+
+
+def _team_names(sport_key, count):
+    """Returns count distinct, deterministic team names for a league."""
+    league = sport_key.split('_')[-1].upper()
+    return [f"{league} Club {i:03d}" for i in range(count)]
+
+
+def _prices(probabilities, margin, rng):
+    """Turns true probabilities into decimal prices with a bookmaker margin and noise."""
+    quoted = [p * (1 + margin) * rng.uniform(0.97, 1.03) for p in probabilities]
+    return [max(1.01, round(1 / q, 2)) for q in quoted]
+
+
+def _market(key, home, away, probabilities, margin, rng, draw):
+    """Builds one bookmaker market for a matchup."""
+    if key == 'h2h':
+        names = [home, away] + (['Draw'] if draw else [])
+        return {'key': key, 'outcomes': [{'name': name, 'price': price}
+                                         for name, price in zip(names, _prices(probabilities, margin, rng))]}
+    if key == 'spreads':
+        line = rng.choice([0.5, 1.0, 1.5, 2.5]) if rng.random() < 0.9 else 3.5
+        home_price, away_price = _prices([0.5, 0.5], margin, rng)
+        return {'key': key, 'outcomes': [{'name': home, 'price': home_price, 'point': -line},
+                                         {'name': away, 'price': away_price, 'point': line}]}
+    line = rng.choice([2.5, 2.5, 2.5, 3.5])
+    over, under = _prices([0.5, 0.5], margin, rng)
+    return {'key': key, 'outcomes': [{'name': 'Over', 'price': over, 'point': line},
+                                     {'name': 'Under', 'price': under, 'point': line}]}
+
+
+def generate_events(n_events=LEAGUE_EVENTS, n_bookmakers=DEFAULT_BOOKMAKERS, markets=('h2h',),
+                    sport_key='soccer_epl', sport_title='EPL', seed=0, coverage=0.85, draw=True, now=None):
+    """Returns a synthetic odds payload of n_events matchups for one league.
+
+    Each bookmaker quotes each event with probability coverage; h2h markets
+    include a draw when draw is set (soccer), except for an occasional
+    bookmaker that leaves it out.
+    """
+    rng = random.Random(seed)
+    now = now or datetime(2024, 1, 1, tzinfo=timezone.utc)
+    bookmakers = (BOOKMAKER_KEYS * (n_bookmakers // len(BOOKMAKER_KEYS) + 1))[:n_bookmakers]
+    bookmakers = [key if i < len(BOOKMAKER_KEYS) else f"{key}_{i // len(BOOKMAKER_KEYS)}"
+                  for i, key in enumerate(bookmakers)]
+    margins = [rng.uniform(0.02, 0.08) for _ in bookmakers]
+    teams = _team_names(sport_key, max(20, 2 * n_events // 10))
+
+    events = []
+    for _ in range(n_events):
+        home, away = rng.sample(teams, 2)
+        strength = rng.uniform(-1.2, 1.2)
+        p_draw = rng.uniform(0.2, 0.3) if draw else 0.0
+        p_home = (1 - p_draw) / (1 + 2.718 ** -strength)
+        probabilities = [p_home, 1 - p_draw - p_home] + ([p_draw] if draw else [])
+        commence = now + timedelta(hours=rng.randint(2, 24 * 14))
+        quotes = []
+        for key, margin in zip(bookmakers, margins):
+            if rng.random() > coverage:
+                continue
+            updated = commence - timedelta(hours=rng.randint(1, 48), minutes=rng.randint(0, 59))
+            quotes.append({
+                'key': key,
+                'title': key.replace('_', ' ').title(),
+                'last_update': updated.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'markets': [_market(market, home, away, probabilities, margin, rng, draw and rng.random() > 0.02)
+                            for market in markets],
+            })
+        events.append({
+            'id': uuid.UUID(int=rng.getrandbits(128)).hex,
+            'sport_key': sport_key,
+            'sport_title': sport_title,
+            'commence_time': commence.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'home_team': home,
+            'away_team': away,
+            'bookmakers': quotes,
+        })
+    return events
+
+
+def generate_outrights(n_runners=30, n_bookmakers=DEFAULT_BOOKMAKERS, sport_key='basketball_nba_championship_winner',
+                       sport_title='NBA Championship Winner', seed=0, now=None):
+    """Returns a synthetic outright (futures) payload with one event of n_runners outcomes."""
+    rng = random.Random(seed)
+    now = now or datetime(2024, 1, 1, tzinfo=timezone.utc)
+    weights = [rng.paretovariate(1.5) for _ in range(n_runners)]
+    probabilities = [w / sum(weights) for w in weights]
+    runners = _team_names(sport_key, n_runners)
+    bookmakers = []
+    for key in BOOKMAKER_KEYS[:n_bookmakers]:
+        margin = rng.uniform(0.15, 0.35)
+        bookmakers.append({
+            'key': key,
+            'title': key.replace('_', ' ').title(),
+            'last_update': now.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'markets': [{'key': 'outrights', 'outcomes': [
+                {'name': name, 'price': price}
+                for name, price in zip(runners, _prices(probabilities, margin, rng))]}],
+        })
+    return [{
+        'id': uuid.UUID(int=rng.getrandbits(128)).hex,
+        'sport_key': sport_key,
+        'sport_title': sport_title,
+        'commence_time': (now + timedelta(days=150)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'home_team': None,
+        'away_team': None,
+        'bookmakers': bookmakers,
+    }]
+
+
+def generate_payload(scale=1, n_bookmakers=DEFAULT_BOOKMAKERS, markets=('h2h',), seed=0):
+    """Returns the events of scale leagues' worth of matchups (scale x LEAGUE_EVENTS events).
+
+    Events are spread over several sport keys, as a multi-league scan would
+    return them.
+    """
+    events = []
+    for league in range(scale):
+        events.extend(generate_events(LEAGUE_EVENTS, n_bookmakers, markets, sport_key=f'soccer_league{league % 50:02d}',
+                                      sport_title=f'League {league % 50:02d}', seed=seed * 100_003 + league))
+    return events
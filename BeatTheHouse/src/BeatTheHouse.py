@@ -3,9 +3,20 @@
 import streamlit as st
 import pandas as pd
 from main import (
-    display_current_odds_df, fetch_upcoming_events,
-    prepare_fixture_data, prepare_odds_data, recommend_bets, SPORTS_LEAGUES
+    bookmaker_odds_views, display_current_odds_df, highlight_best_prices, fetch_events_for_leagues, fetch_upcoming_events, is_cached,
+    h2h_frames, league_markets, normalize_quotes, prefetch_events, quota, quotes_table, recommend_bets, DEFAULT_MARKETS, OUTRIGHT_MARKETS,
+    SPORTS_LEAGUES
 )
+from live_store import LIVE_SNAPSHOT_DIR, LiveSnapshotStore
+from metrics import metrics, start_metrics_server
+from odds_book import OddsBook
+from portfolio import DEFAULT_KELLY_FRACTION
+from simulator import simulate_bankroll
+from snapshot_store import ODDS_ARCHIVE_DIR, SnapshotStore, archive_fetches
+from value_scanner import find_arbitrage, find_value_bets, scan_prices, scan_quotes
+
+# Rows per page in the per-bookmaker odds tables
+ODDS_PAGE_SIZE = 100
 
 # Initialize session state for page navigation
 if 'page' not in st.session_state:
@@ -16,6 +27,100 @@ def set_page(page_name):
     st.session_state.page = page_name
 
 
+@st.cache_resource
+def get_metrics_server():
+    """Starts the process-wide Prometheus endpoint once when METRICS_PORT is set."""
+    return start_metrics_server() if metrics.enabled else None
+
+
+def show_metrics_panel():
+    """Shows per-stage timings, counters and histograms in a sidebar debug panel."""
+    if not metrics.enabled:
+        return
+    with st.sidebar.expander("🛠️ Debug: Metrics"):
+        summary = pd.DataFrame(metrics.summary())
+        if summary.empty:
+            st.write("No metrics recorded yet.")
+        else:
+            st.dataframe(summary)
+        if st.button("Reset metrics"):
+            metrics.reset()
+
+
+@st.cache_resource
+def get_snapshot_store():
+    """Returns the process-wide odds archive, or None when ODDS_ARCHIVE_DIR is unset."""
+    if not ODDS_ARCHIVE_DIR:
+        return None
+    store = SnapshotStore(ODDS_ARCHIVE_DIR)
+    archive_fetches(store)
+    return store
+
+
+def load_archived_snapshot(scan_keys):
+    """Serves the last archived snapshot on a cold start and warms the cache in the background."""
+    store = get_snapshot_store()
+    if store is None or any(is_cached(key) for key in scan_keys):
+        return None
+    snapshot = store.latest(scan_keys)
+    if snapshot is not None:
+        prefetch_events(scan_keys)
+    return snapshot
+
+
+@st.cache_resource
+def get_live_store():
+    """Returns the process-wide reader of the ingestion worker's snapshots, or None when LIVE_SNAPSHOT_DIR is unset."""
+    return LiveSnapshotStore(LIVE_SNAPSHOT_DIR) if LIVE_SNAPSHOT_DIR else None
+
+
+def load_live_snapshot(scan_keys, selected_markets):
+    """Returns (fixtures, quotes, X_fix, O_fix) published by the ingestion worker, or None to fetch directly.
+
+    Reruns only compare snapshot versions; the frames are rebuilt when a
+    scanned league publishes a new version. When a scanned league is
+    unpublished, its snapshot is older than LIVE_SNAPSHOT_MAX_AGE because
+    the worker stalled, or the worker does not poll every selected market,
+    the page falls back to a direct fetch.
+    """
+    store = get_live_store()
+    needed = {key: league_markets(key, ','.join(selected_markets)) for key in scan_keys}
+    if store is None or None in store.versions(scan_keys, needed):
+        return None
+    snapshot = store.read_many(scan_keys, needed)
+    if snapshot is None:
+        return None
+    versions, fixtures, quotes = snapshot
+    token = (tuple(scan_keys), versions, tuple(selected_markets))
+    cached = st.session_state.get('live_snapshot')
+    if cached is None or cached[0] != token:
+        wanted = quotes['market'].isin(list(selected_markets) + [OUTRIGHT_MARKETS])
+        if not wanted.all():
+            quotes = quotes[wanted.to_numpy()].reset_index(drop=True)
+        cached = (token, (fixtures, quotes, *h2h_frames(fixtures, quotes)))
+        st.session_state['live_snapshot'] = cached
+    return cached[1]
+
+
+def get_bookmaker_views(odds_book, scan_keys):
+    """Returns per-bookmaker odds tables, rebuilt only when the odds book changes."""
+    cached = st.session_state.get('bookmaker_views')
+    token = (tuple(scan_keys), odds_book.version)
+    if cached is None or cached[0] != token:
+        cached = (token, bookmaker_odds_views(odds_book.frame()))
+        st.session_state['bookmaker_views'] = cached
+    return cached[1]
+
+
+def get_odds_book(scan_keys):
+    """Returns this session's incremental odds book for the scanned league(s)."""
+    books = st.session_state.setdefault('odds_books', {})
+    scope = tuple(scan_keys)
+    if scope not in books:
+        books[scope] = OddsBook()
+    return books[scope]
+
+
 def welcome_page():
     """Displays the welcome page."""
     st.markdown(
@@ -58,6 +163,7 @@ def welcome_page():
 
 def betting_calculator_page():
     """Displays the betting calculator interface."""
+    get_metrics_server()
     st.markdown(
         """
         <style>
@@ -103,79 +209,171 @@ def betting_calculator_page():
         league_keys = [league['key'] for league in leagues]
         selected_league_name = st.sidebar.selectbox("", league_names)
         selected_league_key = league_keys[league_names.index(selected_league_name)]
+        scan_scope = st.sidebar.radio(
+            "Leagues to scan",
+            ["Selected league", "All leagues in category", "All leagues"],
+        )
 
         # Step 3: View Current Game Odds
         st.sidebar.subheader("3. Options")
         view_odds = st.sidebar.checkbox("👁️ View Current Game Odds")
+        scan_value = st.sidebar.checkbox("🔎 Scan for Value Bets & Arbitrage")
+        selected_markets = st.sidebar.multiselect(
+            "📑 Markets (each extra market costs API credits)", ["h2h", "spreads", "totals"], default=["h2h"]
+        )
+        markets = ','.join(selected_markets) or DEFAULT_MARKETS
 
         # Step 4: User Inputs for Betting
         st.sidebar.subheader("4. Betting Parameters")
         available_funds = st.sidebar.number_input("💰 Available Funds ($)", min_value=1.0, step=10.0, value=100.0)
         max_bets = st.sidebar.number_input("🎯 Maximum Number of Bets", min_value=1, step=1, value=10)
+        staking = st.sidebar.selectbox("⚖️ Stake Sizing", ["Proportional to odds", "Fractional Kelly"])
+        strategy = 'kelly' if staking == "Fractional Kelly" else 'proportional'
+        kelly_fraction = (st.sidebar.slider("Kelly Fraction", min_value=0.1, max_value=1.0, value=DEFAULT_KELLY_FRACTION,
+                                            step=0.05) if strategy == 'kelly' else DEFAULT_KELLY_FRACTION)
+        simulate = st.sidebar.checkbox("🎲 Simulate Bankroll Over Repeated Days")
+        simulation_days = st.sidebar.number_input("📅 Days to Simulate", min_value=1, step=1, value=30) if simulate else 0
 
-        # Fetch Events and Odds based on selected league
+        # Fetch Events and Odds based on selected league(s)
         try:
-            events = fetch_upcoming_events(selected_league_key)
-            if not events:
-                st.error("🚫 No upcoming events found for the selected league.")
-                return
+            if scan_scope == "Selected league":
+                scan_keys = [selected_league_key]
+            elif scan_scope == "All leagues in category":
+                scan_keys = league_keys
+            else:
+                scan_keys = [league['key'] for group in SPORTS_LEAGUES.values() for league in group]
 
-            X_fix = prepare_fixture_data(events)
-            O_fix = prepare_odds_data(events)
+            live = load_live_snapshot(scan_keys, markets.split(','))
+            snapshot = load_archived_snapshot(scan_keys) if live is None and markets == DEFAULT_MARKETS else None
+            fixtures, quotes, polled = None, None, scan_keys
+            if live is not None:
+                fixtures, quotes, X_fix, O_fix = live
+                if fixtures.empty:
+                    st.error("🚫 No upcoming events found for the selected league.")
+                    return
+            elif snapshot is not None:
+                st.info("ℹ️ Showing the last archived odds while live odds load. Refresh shortly for live prices.")
+                X_fix, O_fix = snapshot
+                polled = None
+            else:
+                if scan_scope == "Selected league":
+                    events = fetch_upcoming_events(selected_league_key, markets=markets)
+                else:
+                    events, failures = fetch_events_for_leagues(scan_keys, markets=markets)
+                    if failures:
+                        st.warning(f"⚠️ Could not fetch {len(failures)} of {len(scan_keys)} leagues: {', '.join(failures)}")
+                    polled = [key for key in scan_keys if key not in failures]
+                if not events:
+                    st.error("🚫 No upcoming events found for the selected league.")
+                    return
+
+                fixtures, quotes = normalize_quotes(events)
+                X_fix, O_fix = h2h_frames(fixtures, quotes)
+            # Spreads, totals and outrights (e.g. championship winners) are only covered by the quotes
+            multi_market = quotes is not None and bool((quotes['market'] != 'h2h').any())
+            odds_book = get_odds_book(scan_keys)
+            odds_book.apply(O_fix, polled=polled)
         except Exception as e:
             st.error("An error occurred while fetching or preparing event data. Please try again later.")
             return
 
+        if quota.remaining is not None:
+            st.sidebar.caption(f"Odds API credits remaining: {quota.remaining:.0f} (used {quota.used:.0f})")
+        show_metrics_panel()
+
         # Display Current Odds if selected
         if view_odds:
             st.markdown("<h3 class='subheader'>📊 Current Game Odds</h3>", unsafe_allow_html=True)
             st.markdown(f"**Sport Category:** {selected_sport_category}")
-            st.markdown(f"**League:** {selected_league_name}")
+            st.markdown(f"**League:** {selected_league_name if scan_scope == 'Selected league' else scan_scope}")
 
             try:
-                # Get unique bookmakers
-                bookmakers = O_fix.reset_index()['bookmaker'].unique()
+                if st.checkbox("Compare bookmakers side by side"):
+                    wide_odds = display_current_odds_df(X_fix, O_fix, wide=True)
+                    if len(wide_odds) <= ODDS_PAGE_SIZE:
+                        st.dataframe(highlight_best_prices(wide_odds))
+                    else:
+                        st.dataframe(wide_odds)
+
+                views = get_bookmaker_views(odds_book, scan_keys)
 
-                if len(bookmakers) == 0:
+                if len(views) == 0:
                     st.info("ℹ️ No bookmakers available for this league.")
                 else:
-                    for bookmaker in sorted(bookmakers):
+                    for bookmaker, display_odds in views.items():
                         with st.expander(f"**{bookmaker.capitalize()}**"):
-                            bookmaker_odds = O_fix.reset_index()
-                            bookmaker_odds = bookmaker_odds[bookmaker_odds['bookmaker'] == bookmaker]
-
-                            if bookmaker_odds.empty:
+                            if display_odds.empty:
                                 st.write("No odds available.")
-                            else:
-                                display_odds = bookmaker_odds[
-                                    ['date', 'home_team', 'away_team', 'home_win', 'draw', 'away_win']
-                                ]
-
-                                display_odds = display_odds.rename(columns={
-                                    'date': 'Date',
-                                    'home_team': 'Home Team',
-                                    'away_team': 'Away Team',
-                                    'home_win': 'Home Win Odds',
-                                    'draw': 'Draw Odds',
-                                    'away_win': 'Away Win Odds'
-                                })
-
+                            elif len(display_odds) <= ODDS_PAGE_SIZE:
                                 st.dataframe(display_odds)
+                            else:
+                                pages = (len(display_odds) - 1) // ODDS_PAGE_SIZE + 1
+                                page = st.number_input(
+                                    f"Page (of {pages})", min_value=1, max_value=pages, value=1,
+                                    key=f"odds_page_{bookmaker}",
+                                )
+                                start = (page - 1) * ODDS_PAGE_SIZE
+                                st.dataframe(display_odds.iloc[start:start + ODDS_PAGE_SIZE])
+                if multi_market:
+                    with st.expander("**Spreads, Totals & Outrights**"):
+                        st.dataframe(quotes_table(fixtures, quotes, markets=["spreads", "totals", "outrights"]))
             except Exception:
                 st.error("An error occurred while displaying odds. Please try again later.")
 
+        # Display Value Bets and Arbitrage across bookmakers if selected
+        if scan_value:
+            st.markdown("<h3 class='subheader'>🔎 Value Bets & Arbitrage</h3>", unsafe_allow_html=True)
+            try:
+                scan = scan_quotes(fixtures, quotes) if multi_market else scan_prices(O_fix)
+                display_columns = {
+                    'date': 'Date',
+                    'home_team': 'Home Team',
+                    'away_team': 'Away Team',
+                    'market': 'Market',
+                    **({'outcome': 'Outcome', 'point': 'Point'} if multi_market else {}),
+                    'bookmaker': 'Bookmaker',
+                    'odds': 'Best Odds',
+                }
+
+                arbs = find_arbitrage(scan, available_funds)
+                if arbs.empty:
+                    st.info("ℹ️ No arbitrage opportunities across bookmakers right now.")
+                else:
+                    st.markdown("**Arbitrage Opportunities**")
+                    st.dataframe(arbs[list(display_columns) + ['stake', 'guaranteed_profit']].rename(columns={
+                        **display_columns, 'stake': 'Stake ($)', 'guaranteed_profit': 'Guaranteed Profit ($)'
+                    }))
+
+                value_bets = find_value_bets(scan)
+                if value_bets.empty:
+                    st.info("ℹ️ No positive expected value bets right now.")
+                else:
+                    st.markdown("**Positive Expected Value Bets**")
+                    st.dataframe(value_bets[list(display_columns) + ['fair_probability', 'expected_value']].rename(columns={
+                        **display_columns, 'fair_probability': 'Fair Probability', 'expected_value': 'Expected Value'
+                    }))
+            except Exception:
+                st.error("An error occurred while scanning for value bets. Please try again later.")
+
         # Button to Get Recommendations
         if st.sidebar.button("📈 Get Betting Recommendations"):
             with st.spinner('Generating recommendations...'):
                 try:
-                    recommendations = recommend_bets(X_fix, O_fix, available_funds, max_bets)
+                    staking_options = {'strategy': strategy, 'kelly_fraction': kelly_fraction}
+                    if multi_market:
+                        recommendations = recommend_bets(X_fix, O_fix, available_funds, max_bets,
+                                                         fixtures=fixtures, quotes=quotes, **staking_options)
+                    else:
+                        recommendations = recommend_bets(X_fix, O_fix, available_funds, max_bets, odds_book=odds_book,
+                                                         **staking_options)
 
                     current_bets = recommendations.get('current_bets', [])
                     if current_bets:
                         st.markdown("---")
                         st.markdown("<h3 class='subheader'>Recommended Bets Based on Current Odds</h3>", unsafe_allow_html=True)
                         for bet in current_bets:
-                            with st.expander(f"{bet['home_team']} vs {bet['away_team']} on {bet['date'].date()}"):
+                            event = bet['sport'] if pd.isna(bet['home_team']) else f"{bet['home_team']} vs {bet['away_team']}"
+                            with st.expander(f"{event} on {bet['date'].date()}"):
                                 col1, col2 = st.columns(2)
                                 with col1:
                                     st.markdown(f"**Bet:** {bet['bet_description']}")
@@ -183,8 +381,25 @@ def betting_calculator_page():
                                 with col2:
                                     st.markdown(f"**Odds:** {bet['odds']}")
                                     st.markdown(f"**Recommended Stake:** ${bet['stake']:.2f}")
+
+                        if simulate:
+                            simulation = simulate_bankroll(
+                                current_bets, available_funds, n_days=int(simulation_days),
+                                n_paths=100_000, O_fix=O_fix, workers=1,
+                            )
+                            if simulation:
+                                st.markdown("<h3 class='subheader'>🎲 Bankroll Simulation</h3>", unsafe_allow_html=True)
+                                col1, col2, col3 = st.columns(3)
+                                col1.metric("Median Bankroll", f"${simulation['percentiles'][50]:.2f}")
+                                col2.metric("Chance of Profit", f"{simulation['probability_of_profit']:.1%}")
+                                col3.metric("Risk of Ruin", f"{simulation['risk_of_ruin']:.1%}")
+                                st.caption(
+                                    f"{simulation['paths']:,} simulated paths over {simulation['days']} days. "
+                                    f"5th-95th percentile: ${simulation['percentiles'][5]:.2f} - ${simulation['percentiles'][95]:.2f}"
+                                )
                     else:
-                        st.info("ℹ️ No current odds-based bets to recommend.")
+                        st.info("ℹ️ No current odds-based bets to recommend."
+                                + (" No outcome is priced above its fair probability." if strategy == 'kelly' else ""))
                 except Exception:
                     st.error("An error occurred while generating recommendations. Please try again later.")
     except Exception:
@@ -0,0 +1,258 @@
+# backtest.py
+
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from main import H2H_OUTCOMES
+
+GAME_KEYS = ['date', 'home_team', 'away_team']
+STRATEGIES = ('proportional', 'flat', 'kelly', 'favorites')
+
+
+def load_snapshots(path, sport_keys=None, start=None, end=None):
+    """Loads historical odds snapshots from an archive directory or a CSV file.
+
+    Snapshots are O_fix rows (date, home_team, away_team, bookmaker and the
+    home_win/draw/away_win prices) with a polled_at column telling which poll
+    each row belongs to.
+    """
+    if os.path.isdir(path):
+        from snapshot_store import SnapshotStore
+        return SnapshotStore(path).read_odds(sport_keys=sport_keys, start=start, end=end)
+    snapshots = pd.read_csv(path, parse_dates=['date', 'polled_at'])
+    if sport_keys is not None and 'sport_key' in snapshots.columns:
+        snapshots = snapshots[snapshots['sport_key'].isin(sport_keys)]
+    return snapshots
+
+
+def load_results(path):
+    """Loads game results from a CSV with date, home_team, away_team and result columns.
+
+    result must be one of home_win, draw or away_win.
+    """
+    results = pd.read_csv(path, parse_dates=['date'])
+    results['date'] = results['date'].dt.normalize()
+    unknown = ~results['result'].isin(H2H_OUTCOMES)
+    if unknown.any():
+        raise ValueError(f"Unknown results in {path}: {sorted(results.loc[unknown, 'result'].unique())}")
+    return results[GAME_KEYS + ['result'] + (['sport_key'] if 'sport_key' in results.columns else [])]
+
+
+def closing_polls(frame):
+    """Keeps each game's rows from a single poll: the last one taken before its commence date.
+
+    Archived dates are commence dates without a time, so a game only seen
+    on the day it is played keeps its first poll of that day instead, which
+    avoids in-play prices.
+    """
+    polled = pd.to_datetime(frame['polled_at'], utc=True).dt.tz_convert(None)
+    games = [frame[key] for key in GAME_KEYS]
+    before = polled.where(polled < frame['date'])
+    chosen = before.groupby(games).transform('max').fillna(polled.groupby(games).transform('min'))
+    return frame[(polled == chosen).to_numpy()]
+
+
+def build_candidates(snapshots, results, slate_by='date', resolver=None):
+    """Flattens snapshots into one row per (slate, game, bookmaker, outcome) with its result.
+
+    Each row carries the decimal odds, the consensus no-vig probability of the
+    outcome within its slate and whether the outcome won. By default there
+    is one slate per game date, priced from every game's closing poll (see
+    closing_polls), so each game is bet once however often it was polled;
+    slate_by='polled_at' replays every archived poll as its own slate
+    instead. Games without a known result are dropped, since bets on them
+    cannot be evaluated. With a TeamNameResolver, result team names are
+    mapped onto the snapshot spellings first.
+    """
+    frame = snapshots.reset_index() if GAME_KEYS[0] not in snapshots.columns else snapshots
+    if resolver is not None:
+        if 'sport_key' in frame.columns:
+            resolver.add_teams_from_fixtures(frame)
+        else:
+            resolver.add_teams(None, pd.unique(pd.concat([frame['home_team'], frame['away_team']]).astype(str)))
+        results = resolver.canonicalize(results)
+    poll_columns = ['polled_at'] if 'polled_at' in frame.columns else []
+    columns = list(dict.fromkeys(poll_columns + [slate_by] + GAME_KEYS + ['bookmaker'] + H2H_OUTCOMES))
+    frame = frame[columns].copy()
+    for column in ('home_team', 'away_team', 'bookmaker'):
+        frame[column] = frame[column].astype(str)
+    frame['date'] = pd.to_datetime(frame['date']).dt.normalize()
+    frame = frame.merge(results[GAME_KEYS + ['result']], on=GAME_KEYS, how='inner')
+    if slate_by != 'polled_at' and poll_columns:
+        frame = closing_polls(frame)
+
+    prices = frame[H2H_OUTCOMES].to_numpy(dtype=float)
+    quoted = prices > 1
+    implied = np.where(quoted, 1 / np.where(quoted, prices, 1), 0.0)
+    book_overround = implied.sum(axis=1, keepdims=True)
+    fair = np.divide(implied, book_overround, out=np.zeros_like(implied), where=book_overround > 0)
+
+    n = len(frame)
+    slate_codes, slates = pd.factorize(frame[slate_by], sort=True)
+    game_codes = frame.groupby(list(dict.fromkeys([slate_by] + GAME_KEYS)), sort=False).ngroup().to_numpy()
+    result = frame['result'].to_numpy()
+    candidates = pd.DataFrame({
+        'slate': np.repeat(slate_codes, len(H2H_OUTCOMES)),
+        'game': np.repeat(game_codes, len(H2H_OUTCOMES)),
+        'bookmaker': np.repeat(frame['bookmaker'].to_numpy(), len(H2H_OUTCOMES)),
+        'market': np.tile(H2H_OUTCOMES, n),
+        'odds': prices.ravel(),
+        'fair_probability': fair.ravel(),
+        'won': np.repeat(result, len(H2H_OUTCOMES)) == np.tile(H2H_OUTCOMES, n),
+    })
+    candidates = candidates[quoted.ravel()]
+    candidates['fair_probability'] = candidates.groupby(['game', 'market'])['fair_probability'].transform('mean')
+    candidates.attrs['slates'] = slates
+    return candidates.reset_index(drop=True)
+
+
+def _pick(candidates, strategy, max_bets, kelly_fraction, favorite_max_odds):
+    """Selects up to max_bets per slate for one strategy, returning a long frame with a rank column."""
+    if strategy == 'kelly':
+        # Best available price per outcome, scored by its Kelly fraction
+        best = (candidates.sort_values('odds', ascending=False, kind='mergesort')
+                          .drop_duplicates(subset=['game', 'market'], keep='first'))
+        best['score'] = kelly_fraction * (best['fair_probability'] * best['odds'] - 1) / (best['odds'] - 1)
+        best = best[best['score'] > 0]
+        picks = (best.sort_values('score', ascending=False, kind='mergesort')
+                     .drop_duplicates(subset=['game'], keep='first'))
+    else:
+        # The current strategy: the lowest price of every game, shortest odds first
+        picks = (candidates.sort_values('odds', ascending=True, kind='mergesort')
+                           .drop_duplicates(subset=['game'], keep='first'))
+        if strategy == 'favorites':
+            picks = picks[picks['odds'] <= favorite_max_odds]
+        picks = picks.assign(score=-picks['odds'])
+
+    picks = picks.sort_values(['slate', 'score'], ascending=[True, False], kind='mergesort')
+    picks['rank'] = picks.groupby('slate').cumcount()
+    return picks[picks['rank'] < max_bets]
+
+
+def _stake_matrix(odds, score, count, strategy, total_funds):
+    """Vectorized stake allocation for every slate (rows) and pick (columns)."""
+    valid = ~np.isnan(odds)
+    rows = np.arange(len(odds))
+    if strategy == 'kelly':
+        stakes = np.where(valid, score, 0.0) * total_funds
+        staked = stakes.sum(axis=1, keepdims=True)
+        stakes = np.where(staked > total_funds, stakes * total_funds / np.maximum(staked, 1e-12), stakes)
+        return np.round(stakes, 2)
+    if strategy == 'flat':
+        stakes = np.where(valid, total_funds / np.maximum(count, 1)[:, None], 0.0)
+    else:
+        # Stake proportional to odds, as in recommend_bets_based_on_current_odds
+        weights = np.where(valid, odds, 0.0)
+        total = weights.sum(axis=1, keepdims=True)
+        stakes = np.divide(weights, total, out=np.zeros_like(weights), where=total > 0) * total_funds
+    stakes = np.round(stakes, 2)
+    # Push the rounding remainder onto the last bet of each slate
+    has_bets = count > 0
+    remainder = np.round(total_funds - stakes.sum(axis=1), 2)
+    stakes[rows[has_bets], count[has_bets] - 1] += remainder[has_bets]
+    return stakes
+
+
+def backtest(snapshots, results, total_funds, max_bets, strategies=STRATEGIES,
+             kelly_fraction=0.5, favorite_max_odds=2.0, slate_by='date', resolver=None):
+    """Replays every slate of historical snapshots against results for each strategy.
+
+    Slates are game dates by default; pass slate_by='polled_at' to replay
+    every archived poll (see build_candidates).
+
+    Returns (summary, slate_profits): summary has one row per strategy with
+    bets, staked, profit, ROI, per-slate return mean/variance, hit rate and
+    maximum drawdown of the cumulative profit curve; slate_profits holds the
+    profit of every slate (rows) under every strategy (columns).
+    """
+    candidates = build_candidates(snapshots, results, slate_by=slate_by, resolver=resolver)
+    slates = candidates.attrs['slates']
+    n_slates = len(slates)
+
+    summary, slate_profits = [], {}
+    for strategy in strategies:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}'. Choose from {STRATEGIES}.")
+        picks = _pick(candidates, strategy, max_bets, kelly_fraction, favorite_max_odds)
+
+        # Pack picks into (slate, rank) matrices so every slate is evaluated at once
+        slate_idx = picks['slate'].to_numpy()
+        rank_idx = picks['rank'].to_numpy()
+        odds = np.full((n_slates, max_bets), np.nan)
+        score = np.zeros((n_slates, max_bets))
+        won = np.zeros((n_slates, max_bets), dtype=bool)
+        odds[slate_idx, rank_idx] = picks['odds'].to_numpy()
+        score[slate_idx, rank_idx] = picks['score'].to_numpy()
+        won[slate_idx, rank_idx] = picks['won'].to_numpy()
+        count = np.bincount(slate_idx, minlength=n_slates)
+
+        stakes = _stake_matrix(odds, score, count, strategy, total_funds)
+        payouts = np.where(won, stakes * np.nan_to_num(odds), 0.0)
+        staked = stakes.sum(axis=1)
+        profit = payouts.sum(axis=1) - staked
+        slate_return = np.divide(profit, staked, out=np.zeros_like(profit), where=staked > 0)
+
+        equity = np.cumsum(profit)
+        drawdown = np.maximum.accumulate(np.maximum(equity, 0)) - equity
+        total_staked = staked.sum()
+        n_bets = int(count.sum())
+        summary.append({
+            'strategy': strategy,
+            'slates': int((count > 0).sum()),
+            'bets': n_bets,
+            'staked': round(float(total_staked), 2),
+            'profit': round(float(profit.sum()), 2),
+            'roi': float(profit.sum() / total_staked) if total_staked > 0 else 0.0,
+            'mean_slate_return': float(slate_return[count > 0].mean()) if n_bets else 0.0,
+            'slate_return_variance': float(slate_return[count > 0].var()) if n_bets else 0.0,
+            'hit_rate': float(won.sum() / n_bets) if n_bets else 0.0,
+            'max_drawdown': round(float(drawdown.max()), 2) if n_slates else 0.0,
+        })
+        slate_profits[strategy] = profit
+
+    logging.info(f"Backtested {len(strategies)} strategies over {n_slates} slates.")
+    return pd.DataFrame(summary).set_index('strategy'), pd.DataFrame(slate_profits, index=slates)
+
+
+def main():
+    """Runs a backtest from the command line and prints the summary."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Backtest stake allocation strategies on archived odds.")
+    parser.add_argument('snapshots', help="Odds archive directory or snapshot CSV file")
+    parser.add_argument('results', help="Results CSV with date, home_team, away_team, result")
+    parser.add_argument('--funds', type=float, default=100.0, help="Funds staked per slate")
+    parser.add_argument('--max-bets', type=int, default=10, help="Maximum bets per slate")
+    parser.add_argument('--sport', action='append', dest='sport_keys', help="Restrict to a league key (repeatable)")
+    parser.add_argument('--kelly-fraction', type=float, default=0.5)
+    parser.add_argument('--favorite-max-odds', type=float, default=2.0)
+    parser.add_argument('--per-poll', action='store_true',
+                        help="Replay every archived poll as a slate instead of one slate per game date")
+    parser.add_argument('--match-team-names', action='store_true',
+                        help="Fuzzy-match result team names onto the snapshot spellings")
+    args = parser.parse_args()
+
+    resolver = None
+    if args.match_team_names:
+        from team_names import TeamNameResolver
+        resolver = TeamNameResolver()
+
+    summary, _ = backtest(
+        load_snapshots(args.snapshots, sport_keys=args.sport_keys),
+        load_results(args.results),
+        args.funds, args.max_bets,
+        kelly_fraction=args.kelly_fraction,
+        favorite_max_odds=args.favorite_max_odds,
+        slate_by='polled_at' if args.per_poll else 'date',
+        resolver=resolver,
+    )
+    if resolver is not None:
+        resolver.save()
+    print(summary.to_string())
+
+
+if __name__ == "__main__":
+    main()
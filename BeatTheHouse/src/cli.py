@@ -0,0 +1,123 @@
+# cli.py
+
+"""Headless command-line interface for Beat The House.
+
+Fetches one or more leagues and prints or writes recommendations, odds or
+value bets as a table, JSON or CSV. Only argparse is imported up front;
+pandas and the data pipeline are loaded after the arguments are parsed, so
+--help and usage errors return immediately.
+
+Examples:
+    python cli.py --league soccer_epl --funds 50 --max-bets 5
+    python cli.py --category Soccer --output odds --format csv --out odds.csv
+    python cli.py --all --output value --format json
+    python cli.py --league basketball_nba --markets h2h,spreads,totals --output value
+"""
+
+import argparse
+import sys
+
+OUTPUTS = ('recommendations', 'odds', 'value')
+FORMATS = ('table', 'json', 'csv')
+
+
+def build_parser():
+    """Creates the argument parser for the command-line interface."""
+    parser = argparse.ArgumentParser(prog='beatthehouse', description="Beat The House betting recommendations.")
+    scope = parser.add_mutually_exclusive_group(required=True)
+    scope.add_argument('--league', action='append', dest='leagues', metavar='KEY',
+                       help="League key to fetch, e.g. soccer_epl (repeatable)")
+    scope.add_argument('--category', help="Fetch every league in a sport category, e.g. Soccer")
+    scope.add_argument('--all', action='store_true', help="Fetch every league")
+    scope.add_argument('--list-leagues', action='store_true', help="List sport categories and league keys")
+    parser.add_argument('--funds', type=float, default=100.0, help="Available funds in dollars (default 100)")
+    parser.add_argument('--max-bets', type=int, default=10, help="Maximum number of bets (default 10)")
+    parser.add_argument('--staking', choices=('proportional', 'kelly'), default='proportional',
+                        help="Stake sizing: proportional to odds, or fractional Kelly on fair probabilities")
+    parser.add_argument('--kelly-fraction', type=float, default=0.5, help="Kelly multiplier (default 0.5)")
+    parser.add_argument('--markets', default='h2h',
+                        help="Comma-separated markets to fetch: h2h, spreads, totals (default h2h); "
+                             "outright leagues always use outrights")
+    parser.add_argument('--output', choices=OUTPUTS, default='recommendations', help="What to produce")
+    parser.add_argument('--wide', action='store_true',
+                        help="With --output odds, one column per bookmaker plus the best price")
+    parser.add_argument('--format', choices=FORMATS, default='table', help="Output format (default table)")
+    parser.add_argument('--out', help="Write to this file instead of standard output")
+    return parser
+
+
+def _resolve_leagues(args, sports_leagues):
+    """Maps the scope arguments to a list of league keys."""
+    if args.leagues:
+        return args.leagues
+    if args.category:
+        if args.category not in sports_leagues:
+            raise SystemExit(f"Unknown category '{args.category}'. Choose from: {', '.join(sports_leagues)}")
+        return [league['key'] for league in sports_leagues[args.category]]
+    return [league['key'] for group in sports_leagues.values() for league in group]
+
+
+def _write(frame, fmt, out):
+    """Renders a DataFrame in the requested format to a file or standard output."""
+    if fmt == 'json':
+        text = frame.to_json(orient='records', date_format='iso', indent=2)
+    elif fmt == 'csv':
+        text = frame.to_csv(index=False)
+    else:
+        text = frame.to_string(index=False) if not frame.empty else "(no rows)"
+    if out:
+        with open(out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text.rstrip('\n') + '\n')
+
+
+def main(argv=None):
+    """Runs the command-line interface and returns a process exit code."""
+    args = build_parser().parse_args(argv)
+
+    # Heavy imports are deferred until the arguments are known to be valid
+    import pandas as pd
+    import main as core
+
+    if args.list_leagues:
+        rows = [{'category': category, 'league': league['name'], 'key': league['key']}
+                for category, group in core.SPORTS_LEAGUES.items() for league in group]
+        _write(pd.DataFrame(rows), args.format, args.out)
+        return 0
+
+    sport_keys = _resolve_leagues(args, core.SPORTS_LEAGUES)
+    events, failures = core.fetch_events_for_leagues(sport_keys, markets=args.markets)
+    for key, error in failures.items():
+        print(f"warning: could not fetch {key}: {error}", file=sys.stderr)
+    fixtures, quotes = core.normalize_quotes(events)
+    if quotes.empty:
+        print("No upcoming events with odds found.", file=sys.stderr)
+        return 1
+    X_fix, O_fix = core.h2h_frames(fixtures, quotes)
+    # Spreads, totals and outrights are only covered by the quote-level functions
+    multi_market = bool((quotes['market'] != 'h2h').any())
+
+    if args.output == 'recommendations':
+        staking = {'strategy': args.staking, 'kelly_fraction': args.kelly_fraction}
+        if multi_market:
+            bets = core.recommend_bets(X_fix, O_fix, args.funds, args.max_bets,
+                                       fixtures=fixtures, quotes=quotes, **staking)['current_bets']
+        else:
+            bets = core.recommend_bets(X_fix, O_fix, args.funds, args.max_bets, **staking)['current_bets']
+        frame = pd.DataFrame(bets)
+    elif args.output == 'odds':
+        if multi_market and not args.wide:
+            frame = core.quotes_table(fixtures, quotes)
+        else:
+            frame = core.display_current_odds_df(X_fix, O_fix, wide=args.wide)
+    else:
+        from value_scanner import find_value_bets, scan_prices, scan_quotes
+        frame = find_value_bets(scan_quotes(fixtures, quotes) if multi_market else scan_prices(O_fix))
+
+    _write(frame, args.format, args.out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
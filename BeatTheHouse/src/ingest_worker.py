@@ -0,0 +1,69 @@
+# ingest_worker.py
+
+import argparse
+import logging
+
+from live_store import LIVE_SNAPSHOT_DIR, LiveSnapshotStore
+from main import DEFAULT_MARKETS, DEFAULT_REGIONS, SPORTS_LEAGUES, league_markets, normalize_quotes
+from metrics import metrics, start_metrics_server
+from scheduler import QUOTA_RESERVE, PollScheduler
+
+
+class IngestWorker:
+    """Fetches and normalizes leagues once for every UI session and publishes them to a LiveSnapshotStore.
+
+    Polling follows a PollScheduler, so the worker stays within the Odds
+    API quota however many sessions read the store.
+    """
+
+    def __init__(self, store, scheduler):
+        self.store = store
+        self.scheduler = scheduler
+
+    def publish(self, sport_key, events):
+        """Normalizes one successfully polled league's events and publishes them; returns the snapshot version."""
+        with metrics.span('publish', sport_key=sport_key):
+            fixtures, quotes = normalize_quotes(events)
+            version = self.store.publish(sport_key, fixtures, quotes,
+                                         regions=self.scheduler.regions,
+                                         markets=league_markets(sport_key, self.scheduler.markets))
+        metrics.inc('snapshots_published_total', sport_key=sport_key)
+        return version
+
+    def run(self, polls=None):
+        """Polls and publishes leagues as they fall due; runs forever unless polls limits the polls.
+
+        Failed or skipped polls publish nothing, so sessions keep the last
+        good snapshot until it exceeds the store's max_age.
+        """
+        self.scheduler.run(polls=polls, on_events=self.publish)
+
+
+def main():
+    """Runs the ingestion worker for the given leagues (every league by default) until interrupted."""
+    parser = argparse.ArgumentParser(description="Fetch odds once and publish them to the live snapshot store.")
+    parser.add_argument('sport_keys', nargs='*', help="League keys to ingest (default: every league)")
+    parser.add_argument('--root', default=LIVE_SNAPSHOT_DIR, help="Store directory (default: LIVE_SNAPSHOT_DIR)")
+    parser.add_argument('--regions', default=DEFAULT_REGIONS, help=f"Bookmaker regions (default {DEFAULT_REGIONS})")
+    parser.add_argument('--markets', default=DEFAULT_MARKETS, help="Comma-separated markets: h2h, spreads, totals")
+    parser.add_argument('--interval', type=float, default=60.0, help="Base seconds between polls (default 60)")
+    parser.add_argument('--reserve', type=int, default=QUOTA_RESERVE, help="Credits to keep in reserve")
+    parser.add_argument('--polls', type=int, help="Stop after this many polls")
+    args = parser.parse_args()
+    if not args.root:
+        parser.error("set LIVE_SNAPSHOT_DIR or pass --root")
+
+    logging.basicConfig(level=logging.INFO)
+    start_metrics_server()
+    sport_keys = args.sport_keys or [league['key'] for group in SPORTS_LEAGUES.values() for league in group]
+    scheduler = PollScheduler(sport_keys, base_interval=args.interval, reserve=args.reserve,
+                              regions=args.regions, markets=args.markets)
+    worker = IngestWorker(LiveSnapshotStore(args.root), scheduler)
+    try:
+        worker.run(polls=args.polls)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# line_movement.py
+
+import logging
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+from main import calculate_implied_probability, fetch_events_for_leagues, normalize_events
+from odds_book import OddsBook
+
+# Defaults for the detector; probability thresholds are absolute implied-probability changes
+PRICE_WINDOW = 16
+MAX_TRACKED_PRICES = 200_000
+SHARP_MOVE_THRESHOLD = 0.05
+STEAM_MOVE_THRESHOLD = 0.02
+STEAM_MIN_BOOKMAKERS = 3
+STEAM_WINDOW_SECONDS = 600
+
+
+class PriceHistory:
+    """Fixed-size ring buffers of the latest prices per (event_id, bookmaker, market) key.
+
+    All buffers live in preallocated arrays of max_keys x window, so memory is
+    bounded however long the stream runs; when every slot is taken, the least
+    recently updated key is evicted.
+    """
+
+    def __init__(self, window=PRICE_WINDOW, max_keys=MAX_TRACKED_PRICES):
+        self.window = window
+        self.max_keys = max_keys
+        self._slots = OrderedDict()  # key -> row in the arrays, least recently updated first
+        self._free = list(range(max_keys - 1, -1, -1))
+        self._prices = np.full((max_keys, window), np.nan, dtype=np.float32)
+        self._times = np.zeros((max_keys, window), dtype=np.float64)
+        self._next = np.zeros(max_keys, dtype=np.int32)
+        self._count = np.zeros(max_keys, dtype=np.int32)
+
+    def _slot(self, key):
+        """Returns the array row of key, allocating (and evicting if full) as needed."""
+        slot = self._slots.get(key)
+        if slot is not None:
+            self._slots.move_to_end(key)
+            return slot
+        if not self._free:
+            _, evicted = self._slots.popitem(last=False)
+            self._free.append(evicted)
+        slot = self._free.pop()
+        self._prices[slot] = np.nan
+        self._next[slot] = 0
+        self._count[slot] = 0
+        self._slots[key] = slot
+        return slot
+
+    def push(self, keys, prices, times):
+        """Appends one price per key and returns each key's oldest buffered price before the push."""
+        slots = np.fromiter((self._slot(key) for key in keys), dtype=np.int64, count=len(keys))
+        if not len(slots):
+            return np.zeros(0, dtype=np.float32)
+        oldest_pos = np.where(self._count[slots] < self.window, 0, self._next[slots])
+        oldest = self._prices[slots, oldest_pos]
+        positions = self._next[slots]
+        self._prices[slots, positions] = prices
+        self._times[slots, positions] = times
+        self._next[slots] = (positions + 1) % self.window
+        self._count[slots] = np.minimum(self._count[slots] + 1, self.window)
+        return oldest
+
+    def remove(self, keys):
+        """Frees the buffers of keys that are no longer quoted."""
+        for key in keys:
+            slot = self._slots.pop(key, None)
+            if slot is not None:
+                self._free.append(slot)
+
+    def prices(self, key):
+        """Returns the buffered prices of key, oldest first."""
+        slot = self._slots.get(key)
+        if slot is None:
+            return np.zeros(0, dtype=np.float32)
+        order = (np.arange(self.window) + self._next[slot]) % self.window
+        buffered = self._prices[slot, order]
+        return buffered[~np.isnan(buffered)]
+
+    def __len__(self):
+        return len(self._slots)
+
+
+class LineMovementDetector:
+    """Turns OddsBook change sets into sharp-move and steam events.
+
+    A sharp move is a single bookmaker update whose implied probability moves
+    by at least sharp_threshold. Steam is at least min_bookmakers different
+    bookmakers moving the same outcome in the same direction by
+    steam_threshold within steam_window seconds. Work per update is
+    proportional to the number of changed prices.
+    """
+
+    def __init__(self, window=PRICE_WINDOW, max_keys=MAX_TRACKED_PRICES, sharp_threshold=SHARP_MOVE_THRESHOLD,
+                 steam_threshold=STEAM_MOVE_THRESHOLD, min_bookmakers=STEAM_MIN_BOOKMAKERS,
+                 steam_window=STEAM_WINDOW_SECONDS):
+        self.history = PriceHistory(window, max_keys)
+        self.sharp_threshold = sharp_threshold
+        self.steam_threshold = steam_threshold
+        self.min_bookmakers = min_bookmakers
+        self.steam_window = steam_window
+        self.max_outcomes = max_keys
+        self._recent = OrderedDict()     # (event_id, market) -> deque of (time, bookmaker, direction)
+        self._last_steam = {}            # (event_id, market) -> (time, direction) of the last steam event
+
+    def update(self, changes):
+        """Feeds one change set from OddsBook.apply and returns the detected events."""
+        if changes.empty:
+            return []
+        removed = changes['new_odds'].isna().to_numpy()
+        if removed.any():
+            gone = changes[removed]
+            self.history.remove(zip(gone['event_id'], gone['bookmaker'], gone['market']))
+            for key in zip(gone['event_id'], gone['market']):
+                self._recent.pop(key, None)
+                self._last_steam.pop(key, None)
+        moves = changes[~removed]
+
+        times = pd.to_datetime(moves['last_update'], utc=True).astype('int64').to_numpy() / 1e9
+        new = moves['new_odds'].to_numpy(dtype=float)
+        old = moves['old_odds'].to_numpy(dtype=float)
+        oldest = self.history.push(list(zip(moves['event_id'], moves['bookmaker'], moves['market'])), new, times)
+
+        # Positive when the outcome shortens (its implied probability rises)
+        change = calculate_implied_probability(new) - calculate_implied_probability(old)
+        window_change = calculate_implied_probability(new) - calculate_implied_probability(oldest.astype(float))
+        priced = ~np.isnan(old)
+        change = np.where(priced, change, 0.0)
+        window_change = np.where(np.isnan(oldest), 0.0, window_change)
+
+        detected = []
+        sharp = np.abs(change) >= self.sharp_threshold
+        for i in np.flatnonzero(sharp):
+            row = moves.iloc[i]
+            detected.append(self._event('sharp_move', row, change[i], window_change[i], [row['bookmaker']]))
+
+        steam_candidates = np.abs(change) >= self.steam_threshold
+        touched = {}  # (event_id, market) -> {direction: index of its latest move in this poll}
+        for i in np.flatnonzero(steam_candidates):
+            row = moves.iloc[i]
+            key = (row['event_id'], row['market'])
+            recent = self._recent.get(key)
+            if recent is None:
+                recent = self._recent[key] = deque(maxlen=64)
+                if len(self._recent) > self.max_outcomes:
+                    evicted, _ = self._recent.popitem(last=False)
+                    self._last_steam.pop(evicted, None)
+            self._recent.move_to_end(key)
+            direction = np.sign(change[i])
+            recent.append((times[i], row['bookmaker'], direction))
+            touched.setdefault(key, {})[direction] = i
+
+        for key, directions in touched.items():
+            recent = self._recent[key]
+            for direction, i in directions.items():
+                latest = times[i]
+                bookmakers = sorted({bookmaker for moved_at, bookmaker, d in recent
+                                     if d == direction and latest - moved_at <= self.steam_window})
+                if len(bookmakers) < self.min_bookmakers:
+                    continue
+                last = self._last_steam.get(key)
+                if last is not None and last[1] == direction and latest - last[0] <= self.steam_window:
+                    continue
+                self._last_steam[key] = (latest, direction)
+                detected.append(self._event('steam', moves.iloc[i], change[i], window_change[i], bookmakers))
+        return detected
+
+    def _event(self, kind, row, change, window_change, bookmakers):
+        """Builds one line-movement event."""
+        return {
+            'type': kind,
+            'event_id': row['event_id'],
+            'date': row['date'],
+            'home_team': row['home_team'],
+            'away_team': row['away_team'],
+            'market': row['market'],
+            'bookmakers': bookmakers,
+            'old_odds': row['old_odds'],
+            'new_odds': row['new_odds'],
+            'probability_change': float(change),
+            'window_probability_change': float(window_change),
+            'last_update': row['last_update'],
+        }
+
+
+def stream_line_moves(sport_keys, interval=60.0, polls=None, detector=None):
+    """Polls leagues on a schedule and yields line-movement events as they are detected.
+
+    Each poll is fetched fresh, normalized with normalize_events and applied to
+    an OddsBook, so only changed prices reach the detector. Runs forever
+    unless polls limits the number of polls.
+    """
+    book = OddsBook()
+    detector = detector or LineMovementDetector()
+    count = 0
+    while polls is None or count < polls:
+        started = time.monotonic()
+        events, failures = fetch_events_for_leagues(sport_keys, use_cache=False)
+        for key, error in failures.items():
+            logging.warning(f"Line movement poll skipped {key}: {error}")
+        _, O_fix = normalize_events(events)
+        changes = book.apply(O_fix, polled=[key for key in sport_keys if key not in failures])
+        for event in detector.update(changes):
+            yield event
+        count += 1
+        logging.info(f"Line movement poll {count}: {len(changes)} price changes, "
+                     f"{len(detector.history)} prices tracked.")
+        if polls is None or count < polls:
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+def main():
+    """Prints line-movement events for the given leagues as JSON lines until interrupted."""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Stream sharp line moves and steam for selected leagues.")
+    parser.add_argument('sport_keys', nargs='+', help="League keys to watch, e.g. soccer_epl")
+    parser.add_argument('--interval', type=float, default=60.0, help="Seconds between polls (default 60)")
+    parser.add_argument('--sharp-threshold', type=float, default=SHARP_MOVE_THRESHOLD)
+    parser.add_argument('--steam-threshold', type=float, default=STEAM_MOVE_THRESHOLD)
+    parser.add_argument('--min-bookmakers', type=int, default=STEAM_MIN_BOOKMAKERS)
+    args = parser.parse_args()
+
+    detector = LineMovementDetector(sharp_threshold=args.sharp_threshold, steam_threshold=args.steam_threshold,
+                                    min_bookmakers=args.min_bookmakers)
+    try:
+        for event in stream_line_moves(args.sport_keys, interval=args.interval, detector=detector):
+            print(json.dumps(event, default=str), flush=True)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# live_store.py
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# Directory the ingestion worker publishes live odds to; sessions fetch for themselves when unset
+LIVE_SNAPSHOT_DIR = os.getenv('LIVE_SNAPSHOT_DIR', '')
+# Seconds after its last successful poll that a league's snapshot is still served; must exceed the
+# worker's longest poll interval, so readers fall back to fetching only when the worker has stalled
+LIVE_SNAPSHOT_MAX_AGE = float(os.getenv('LIVE_SNAPSHOT_MAX_AGE', '7200'))
+
+# Superseded versions kept on disk so sessions still mapping them can finish reading
+KEEP_VERSIONS = 2
+MANIFEST = 'manifest.json'
+KINDS = ('fixtures', 'quotes')
+
+
+def _pyarrow():
+    """Imports pyarrow lazily so the live store stays an optional feature."""
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("The live snapshot store requires pyarrow (pip install pyarrow).") from e
+    return pa
+
+
+def _write_atomic(path, write):
+    """Writes a file through write(f) under a temporary name and renames it into place."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def snapshot_digest(fixtures, quotes):
+    """Returns a content hash of normalized fixtures and quotes, used to skip unchanged polls."""
+    digest = hashlib.sha1()
+    for frame in (fixtures, quotes):
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _concat_categorical(parts):
+    """Concatenates categorical series over the union of their categories by remapping codes.
+
+    Categories keep their order of first appearance, so per-league event_id
+    categories (fixtures rows in order) concatenate to the combined fixtures
+    rows, and no category values are hashed per row.
+    """
+    non_empty = [part.cat.categories for part in parts if len(part.cat.categories)]
+    if non_empty:
+        categories = non_empty[0].append(non_empty[1:]).unique().astype(non_empty[0].dtype)
+    else:
+        categories = pd.Index([], dtype=object)
+    codes = []
+    for part in parts:
+        # Code -1 (missing) picks the trailing -1
+        mapping = np.append(categories.get_indexer(part.cat.categories), -1)
+        codes.append(mapping[part.cat.codes.to_numpy()])
+    return pd.Categorical.from_codes(np.concatenate(codes), categories=categories)
+
+
+def _concat(frames):
+    """Concatenates frames column by column, merging categoricals with _concat_categorical."""
+    columns = {}
+    for column in frames[0].columns:
+        parts = [frame[column] for frame in frames]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[column] = _concat_categorical(parts)
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+def combine_snapshots(snapshots):
+    """Concatenates per-league (fixtures, quotes) pairs into one pair in normalize_quotes form.
+
+    As in normalize_quotes, an event listed by several leagues is kept at
+    its first occurrence, so quotes['event_id'].cat.codes still index the
+    combined fixtures rows.
+    """
+    non_empty, seen = [], pd.Index([], dtype=object)
+    for fixtures, quotes in snapshots:
+        if not len(fixtures):
+            continue
+        # Fixtures rows are their event_id categories in order
+        repeated = fixtures['event_id'].cat.categories.isin(seen)
+        if repeated.any():
+            fixtures = fixtures[~repeated]
+            quotes = quotes[~repeated[quotes['event_id'].cat.codes.to_numpy()]]
+        seen = seen.append(fixtures['event_id'].cat.categories[~repeated])
+        non_empty.append((fixtures, quotes))
+    if len(non_empty) <= 1:
+        return non_empty[0] if non_empty else snapshots[0]
+    fixtures = _concat([fixtures for fixtures, _ in non_empty])
+    quotes = _concat([quotes for _, quotes in non_empty])
+    quotes['event_id'] = pd.Categorical.from_codes(quotes['event_id'].cat.codes, dtype=fixtures['event_id'].dtype)
+    return fixtures, quotes
+
+
+class LiveSnapshotStore:
+    """Latest normalized odds of every league, shared between processes through Arrow IPC files.
+
+    The ingestion worker publishes each league to
+    <root>/<sport_key>/{fixtures,quotes}-<version>.arrow and then swaps in a
+    manifest.json holding the new version, so a reader never sees a partly
+    written snapshot. The version only moves when the odds change. Readers
+    check the manifests, memory-map the files of a new version and keep the
+    frames per version, so every session in a process shares one copy and
+    rebuilds nothing while the versions stay put. A snapshot not confirmed by
+    a successful poll within max_age seconds is treated as unpublished.
+    """
+
+    def __init__(self, root=LIVE_SNAPSHOT_DIR, max_age=LIVE_SNAPSHOT_MAX_AGE):
+        if not root:
+            raise ValueError("LiveSnapshotStore needs a root directory (set LIVE_SNAPSHOT_DIR).")
+        self.root = root
+        self.max_age = max_age
+        self._loaded = {}    # sport_key -> (version, fixtures, quotes)
+        self._combined = {}  # tuple of sport_keys -> (versions, fixtures, quotes)
+        self._lock = threading.Lock()
+
+    def _path(self, sport_key, name):
+        return os.path.join(self.root, sport_key, name)
+
+    def manifest(self, sport_key):
+        """Returns the league's manifest (version, digest, polled_at, ...), or None if never published."""
+        try:
+            with open(self._path(sport_key, MANIFEST), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def version(self, sport_key, markets=None):
+        """Returns the league's current snapshot version, or None if never published or older than max_age.
+
+        When markets (comma-separated) is given, a snapshot whose manifest
+        does not list every one of them is also treated as unpublished.
+        """
+        manifest = self.manifest(sport_key)
+        if not manifest:
+            return None
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(manifest['polled_at'])
+        if age.total_seconds() > self.max_age:
+            return None
+        if markets:
+            missing = set(markets.split(',')) - set(manifest.get('markets', '').split(','))
+            if missing:
+                logging.info(f"{sport_key} snapshot lacks markets {', '.join(sorted(missing))}.")
+                return None
+        return manifest['version']
+
+    def versions(self, sport_keys, markets=None):
+        """Returns the current versions of sport_keys as a tuple (None for unpublished, stale or uncovered leagues).
+
+        markets optionally maps each sport_key to the markets its snapshot must cover.
+        """
+        markets = markets or {}
+        return tuple(self.version(sport_key, markets.get(sport_key)) for sport_key in sport_keys)
+
+    def publish(self, sport_key, fixtures, quotes, **details):
+        """Publishes a league's normalized snapshot and returns its version.
+
+        When the content matches the current version only the manifest's
+        polled_at moves on, so readers keep their frames. Extra details
+        are stored in the manifest; markets (comma-separated, as requested)
+        is what versions checks readers' markets against.
+        """
+        pa = _pyarrow()
+        os.makedirs(os.path.join(self.root, sport_key), exist_ok=True)
+        current = self.manifest(sport_key) or {}
+        digest = snapshot_digest(fixtures, quotes)
+        version = current.get('version', 0)
+        changed = digest != current.get('digest')
+        if changed:
+            version += 1
+            for kind, frame in zip(KINDS, (fixtures, quotes)):
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+
+                def write(f, table=table):
+                    with pa.ipc.new_file(f, table.schema) as writer:
+                        writer.write_table(table)
+                _write_atomic(self._path(sport_key, f'{kind}-{version}.arrow'), write)
+
+        manifest = dict(details, version=version, digest=digest, events=len(fixtures), quotes=len(quotes),
+                        polled_at=datetime.now(timezone.utc).isoformat())
+        _write_atomic(self._path(sport_key, MANIFEST), lambda f: f.write(json.dumps(manifest).encode('utf-8')))
+        if changed:
+            self._prune(sport_key, version)
+            logging.info(f"Published {sport_key} snapshot v{version} ({len(quotes)} quotes).")
+        return version
+
+    def _prune(self, sport_key, version):
+        """Deletes snapshot files more than KEEP_VERSIONS versions old."""
+        for name in os.listdir(os.path.join(self.root, sport_key)):
+            stem, _, extension = name.rpartition('.')
+            kind, _, file_version = stem.rpartition('-')
+            if extension == 'arrow' and kind in KINDS and file_version.isdigit() \
+                    and int(file_version) < version - KEEP_VERSIONS:
+                try:
+                    os.unlink(self._path(sport_key, name))
+                except FileNotFoundError:
+                    pass
+
+    def _read_version(self, sport_key, version):
+        """Memory-maps one published version and returns its (fixtures, quotes)."""
+        pa = _pyarrow()
+        frames = []
+        for kind in KINDS:
+            with pa.memory_map(self._path(sport_key, f'{kind}-{version}.arrow')) as source:
+                frame = pa.ipc.open_file(source).read_all().to_pandas()
+            # normalize_quotes keeps event ids as object categories
+            frame['event_id'] = pd.Categorical.from_codes(
+                frame['event_id'].cat.codes, categories=pd.Index(frame['event_id'].cat.categories, dtype=object))
+            frames.append(frame)
+        return tuple(frames)
+
+    def read(self, sport_key):
+        """Returns (version, fixtures, quotes) of the league's latest snapshot, or None if unpublished or stale."""
+        for _ in range(2):
+            version = self.version(sport_key)
+            if version is None:
+                return None
+            with self._lock:
+                loaded = self._loaded.get(sport_key)
+            if loaded is not None and loaded[0] == version:
+                return loaded
+            try:
+                loaded = (version, *self._read_version(sport_key, version))
+            except FileNotFoundError:
+                # Pruned between reading the manifest and the files; the manifest has moved on
+                continue
+            with self._lock:
+                self._loaded[sport_key] = loaded
+            return loaded
+        return None
+
+    def read_many(self, sport_keys, markets=None):
+        """Returns (versions, fixtures, quotes) combining the latest snapshots of sport_keys.
+
+        Returns None when any league is unpublished, stale or does not cover
+        its markets (as in versions). The combination is kept until one of
+        the versions changes.
+        """
+        scope = tuple(sport_keys)
+        versions = self.versions(scope, markets)
+        if None in versions:
+            return None
+        with self._lock:
+            combined = self._combined.get(scope)
+        if combined is not None and combined[0] == versions:
+            return combined
+
+        snapshots = [self.read(sport_key) for sport_key in scope]
+        if any(snapshot is None for snapshot in snapshots):
+            return None
+        versions = tuple(snapshot[0] for snapshot in snapshots)
+        combined = (versions, *combine_snapshots([snapshot[1:] for snapshot in snapshots]))
+        with self._lock:
+            self._combined[scope] = combined
+        return combined
@@ -5,18 +5,24 @@ import requests
 import pandas as pd
 pd.options.mode.chained_assignment = None  # Suppress SettingWithCopyWarning
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import logging
-
-# Fuzzy matching libraries
-from thefuzz import fuzz
-from thefuzz import process
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 
 # Environment variables and request handling
 from dotenv import load_dotenv
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 
+from metrics import BYTES_BUCKETS, ROWS_BUCKETS, metrics, timed
+from odds_cache import OddsCache
+from portfolio import DEFAULT_KELLY_FRACTION, STAKING_STRATEGIES, kelly_portfolio, proportional_stakes
+from quota import QuotaTracker
+
 # Load environment variables
 load_dotenv()
 
@@ -33,6 +39,40 @@ if not ODDS_API_KEY:
     logging.error("No ODDS_API_KEY found in environment variables.")
     raise ValueError("No ODDS_API_KEY found in environment variables.")
 
+# Odds API request defaults; the base URL can point at a local stub server for testing
+ODDS_API_BASE_URL = os.getenv('ODDS_API_BASE_URL', 'https://api.the-odds-api.com').rstrip('/')
+ODDS_API_URL = ODDS_API_BASE_URL + '/v4/sports/{sport_key}/odds/'
+DEFAULT_REGIONS = 'us,uk,eu'
+DEFAULT_MARKETS = 'h2h'
+
+# Market keys the app understands; outright leagues (the *_winner keys) only offer outrights
+MARKET_KEYS = ['h2h', 'spreads', 'totals', 'outrights']
+OUTRIGHT_MARKETS = 'outrights'
+
+# Odds cache settings (seconds / entries), overridable from the environment
+ODDS_CACHE_TTL = float(os.getenv('ODDS_CACHE_TTL', 60))
+ODDS_CACHE_STALE_TTL = float(os.getenv('ODDS_CACHE_STALE_TTL', 300))
+ODDS_CACHE_MAXSIZE = int(os.getenv('ODDS_CACHE_MAXSIZE', 128))
+
+# Process-wide odds cache shared by every Streamlit session
+odds_cache = OddsCache(ttl=ODDS_CACHE_TTL, maxsize=ODDS_CACHE_MAXSIZE, stale_ttl=ODDS_CACHE_STALE_TTL)
+
+# Odds API credit usage, updated from the headers of every response
+quota = QuotaTracker()
+
+_session = None
+_session_lock = threading.Lock()
+
+# Callables notified with (sport_key, events) after every successful API fetch
+_fetch_listeners = []
+
+# Concurrency and rate-limit handling for bulk fetches
+MAX_CONCURRENT_REQUESTS_PER_HOST = int(os.getenv('MAX_CONCURRENT_REQUESTS_PER_HOST', 16))
+BULK_FETCH_MAX_ATTEMPTS = 3
+_host_semaphores = {}
+_host_backoff_until = {}
+_host_lock = threading.Lock()
+
 # Define the sport to leagues mapping
 SPORTS_LEAGUES = {
     "American Football": [
@@ -119,79 +159,392 @@ SPORTS_LEAGUES = {
     ],
 }
 
-def fetch_upcoming_events(sport_key):
-    """Retrieves upcoming events and their odds for the selected sport."""
-    url = f"https://api.the-odds-api.com/v4/sports/{sport_key}/odds/"
+class _ServerErrorRetry(Retry):
+    """urllib3 Retry that never retries 429, even with a Retry-After header; see get_session."""
+    RETRY_AFTER_STATUS_CODES = frozenset({413, 503})
+
+def get_session():
+    """Returns the shared keep-alive session used for every Odds API request.
+
+    Server errors are retried per request; 429 responses are left to the
+    host-wide backoff in _fetch_league_with_backoff, so concurrent leagues
+    do not each keep hammering a rate-limited host.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                retries = _ServerErrorRetry(total=5, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
+                adapter = HTTPAdapter(max_retries=retries, pool_connections=4, pool_maxsize=32)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+def _host_semaphore(host):
+    """Returns the semaphore limiting concurrent requests to one host."""
+    with _host_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS_PER_HOST)
+        return _host_semaphores[host]
+
+def _is_rate_limited(error):
+    """Checks whether a request error was caused by HTTP 429 Too Many Requests."""
+    response = getattr(error, 'response', None)
+    return response is not None and response.status_code == 429
+
+def _retry_after(error):
+    """Returns the seconds a 429 response's Retry-After header asks for, or None if absent or invalid."""
+    value = error.response.headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def is_outright_league(sport_key):
+    """Checks whether a league is a futures market (e.g. a championship winner) with only outrights."""
+    return sport_key.endswith('_winner')
+
+def league_markets(sport_key, markets=DEFAULT_MARKETS):
+    """Returns the markets to request for a league.
+
+    Outright leagues only quote outrights; other leagues get the requested
+    markets without outrights.
+    """
+    if is_outright_league(sport_key):
+        return OUTRIGHT_MARKETS
+    kept = [market for market in markets.split(',') if market and market != OUTRIGHT_MARKETS]
+    return ','.join(kept) or DEFAULT_MARKETS
+
+def _request_events(sport_key, regions, markets):
+    """Requests events and odds from the Odds API, raising on a non-200 response."""
+    markets = league_markets(sport_key, markets)
     params = {
         'apiKey': ODDS_API_KEY,
-        'regions': 'us,uk,eu',
-        'markets': 'h2h',
+        'regions': regions,
+        'markets': markets,
         'oddsFormat': 'decimal',
         'dateFormat': 'iso',
     }
+    url = ODDS_API_URL.format(sport_key=sport_key)
+    with _host_semaphore(urlparse(url).netloc):
+        with metrics.span('http', sport_key=sport_key):
+            response = get_session().get(url, params=params)
+    quota.update(response.headers)
+    _record_response(response)
+    if response.status_code != 200:
+        logging.error(f"Error fetching events: {response.status_code} - {response.text}")
+        response.raise_for_status()
+        raise requests.HTTPError(f"Unexpected status {response.status_code}", response=response)
+    events = response.json()
+    logging.info(f"Fetched {len(events)} events for {sport_key}.")
+    for listener in list(_fetch_listeners):
+        try:
+            listener(sport_key, events)
+        except Exception as e:
+            logging.error(f"Fetch listener {listener!r} failed for {sport_key}: {e}")
+    return events
 
-    session = requests.Session()
-    retries = Retry(total=5, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
-    session.mount('https://', HTTPAdapter(max_retries=retries))
+def _record_response(response):
+    """Counts an Odds API response by status, with its urllib3 retries and payload size."""
+    if not metrics.enabled:
+        return
+    metrics.inc('http_requests_total', status=response.status_code)
+    retries = getattr(getattr(response.raw, 'retries', None), 'history', None) or ()
+    if retries:
+        metrics.inc('http_retries_total', len(retries))
+    metrics.observe('http_payload_bytes', len(response.content), buckets=BYTES_BUCKETS)
 
-    response = session.get(url, params=params)
-    if response.status_code == 200:
-        events = response.json()
-        logging.info(f"Fetched {len(events)} events for {sport_key}.")
-        return events
-    else:
-        logging.error(f"Error fetching events: {response.status_code} - {response.text}")
+def add_fetch_listener(listener):
+    """Registers listener(sport_key, events) to be called after every successful API fetch."""
+    if listener not in _fetch_listeners:
+        _fetch_listeners.append(listener)
+
+def is_cached(sport_key, regions=DEFAULT_REGIONS, markets=DEFAULT_MARKETS):
+    """Checks whether the odds cache holds a response (fresh or stale) for a league."""
+    return (sport_key, regions, markets) in odds_cache
+
+def prefetch_events(sport_keys, regions=DEFAULT_REGIONS, markets=DEFAULT_MARKETS):
+    """Starts background fetches that warm the odds cache for the given leagues."""
+    for sport_key in sport_keys:
+        odds_cache.load_async(
+            (sport_key, regions, markets),
+            lambda sport_key=sport_key: _request_events(sport_key, regions, markets),
+        )
+
+def fetch_upcoming_events(sport_key, regions=DEFAULT_REGIONS, markets=DEFAULT_MARKETS, use_cache=True,
+                          raise_errors=False):
+    """Retrieves upcoming events and their odds for the selected sport.
+
+    Results are served from the process-wide odds cache when fresh, so
+    Streamlit reruns do not re-hit the API. Pass use_cache=False to force a
+    network request. A failed request returns an empty list, or raises its
+    requests exception with raise_errors=True.
+    """
+    try:
+        if not use_cache:
+            return odds_cache.load(
+                (sport_key, regions, markets),
+                lambda: _request_events(sport_key, regions, markets),
+            )
+        return odds_cache.get(
+            (sport_key, regions, markets),
+            lambda: _request_events(sport_key, regions, markets),
+        )
+    except requests.HTTPError:
+        if raise_errors:
+            raise
         return []
 
-def prepare_fixture_data(events):
-    """Formats fixture data from events."""
-    fixtures = [{
-        'sport': event.get('sport_title', ''),
-        'home_team': event['home_team'],
-        'away_team': event['away_team'],
-        'date': pd.to_datetime(event['commence_time']).date(),
-    } for event in events]
-    X_fix = pd.DataFrame(fixtures)
-    X_fix['date'] = pd.to_datetime(X_fix['date'])
-    return X_fix
+def _fetch_league_with_backoff(sport_key, regions, markets, use_cache):
+    """Fetches one league for a bulk scan, backing off the whole host on 429 responses.
+
+    The backoff honours the response's Retry-After header and otherwise
+    doubles with every attempt.
+    """
+    host = urlparse(ODDS_API_URL).netloc
+    for attempt in range(1, BULK_FETCH_MAX_ATTEMPTS + 1):
+        with _host_lock:
+            wait = _host_backoff_until.get(host, 0) - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            if use_cache:
+                return odds_cache.get(
+                    (sport_key, regions, markets),
+                    lambda: _request_events(sport_key, regions, markets),
+                )
+            return odds_cache.load(
+                (sport_key, regions, markets),
+                lambda: _request_events(sport_key, regions, markets),
+            )
+        except requests.RequestException as e:
+            if not _is_rate_limited(e) or attempt == BULK_FETCH_MAX_ATTEMPTS:
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = 2 ** attempt
+            logging.warning(f"Rate limited fetching {sport_key}, backing off {delay}s (attempt {attempt}).")
+            with _host_lock:
+                _host_backoff_until[host] = max(_host_backoff_until.get(host, 0), time.monotonic() + delay)
+
+@timed('fetch')
+def fetch_events_for_leagues(sport_keys, regions=DEFAULT_REGIONS, markets=DEFAULT_MARKETS,
+                             max_workers=None, use_cache=True):
+    """Fetches several leagues concurrently and combines their events.
+
+    Returns a tuple of (events, failures) where events is the combined list in
+    the order of sport_keys and failures maps each league that could not be
+    fetched to its error message.
+    """
+    sport_keys = list(dict.fromkeys(sport_keys))
+    if not sport_keys:
+        return [], {}
+    workers = max_workers or min(len(sport_keys), MAX_CONCURRENT_REQUESTS_PER_HOST)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='odds-fetch') as executor:
+        futures = {
+            key: executor.submit(_fetch_league_with_backoff, key, regions, markets, use_cache)
+            for key in sport_keys
+        }
+
+    events, failures = [], {}
+    for key, future in futures.items():
+        try:
+            events.extend(future.result())
+        except Exception as e:
+            logging.error(f"Failed to fetch {key}: {e}")
+            failures[key] = str(e)
+    logging.info(f"Fetched {len(events)} events across {len(sport_keys) - len(failures)}/{len(sport_keys)} leagues.")
+    return events, failures
+
+def _is_matchup(event):
+    """Checks whether an event is a head-to-head fixture rather than an outright market."""
+    return bool(event.get('home_team')) and bool(event.get('away_team'))
+
+# Column position of each h2h outcome in the odds arrays
+H2H_OUTCOMES = ['home_win', 'draw', 'away_win']
+
+def _parse_commence_dates(times):
+    """Parses ISO commence times in one batch and truncates them to their UTC date."""
+    return pd.to_datetime(pd.Series(times, dtype=object), utc=True).dt.tz_convert(None).dt.normalize()
+
+def widen_prices(prices):
+    """Converts float32 prices or points to float64 at the precision they were quoted with.
+
+    float32 holds 7 significant digits, so rounding to them turns e.g.
+    1.89999998 back into 1.9.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = 10.0 ** (6 - np.floor(np.log10(np.abs(prices))))
+        return np.where(np.isfinite(scale), np.round(prices * scale) / scale, prices)
+
+@timed('parse')
+def normalize_quotes(events):
+    """Flattens events of every market type into fixtures and outcome-level quotes in one traversal.
+
+    fixtures has one row per event (the first occurrence of each id), with
+    empty home/away teams for outrights. quotes has one row per (event,
+    bookmaker, market, outcome): categorical event_id, bookmaker, market and
+    outcome, float32 price and point (NaN for markets without a line) and the
+    bookmaker's last_update. The event_id categories are the fixtures rows in
+    order, so quotes['event_id'].cat.codes indexes fixtures directly.
+    """
+    # Per-event columns
+    ev_id, ev_sport, ev_sport_key, ev_home, ev_away, ev_time = [], [], [], [], [], []
+    seen = set()
+    # Per (event, bookmaker, market) columns
+    rec_event, rec_bookmaker, rec_market, rec_last_update = [], [], [], []
+    # Per outcome columns
+    out_record, out_name, out_price, out_point = [], [], [], []
 
-def prepare_odds_data(events):
-    """Formats odds data from events."""
-    odds_records = []
     for event in events:
-        home_team = event['home_team']
-        away_team = event['away_team']
-        date = pd.to_datetime(event['commence_time']).date()
+        event_id = event.get('id', '')
+        if event_id in seen:
+            continue
+        seen.add(event_id)
+        e = len(ev_id)
+        ev_id.append(event_id)
+        ev_sport.append(event.get('sport_title', ''))
+        ev_sport_key.append(event.get('sport_key', ''))
+        ev_home.append(event.get('home_team') or None)
+        ev_away.append(event.get('away_team') or None)
+        ev_time.append(event['commence_time'])
         for bookmaker in event.get('bookmakers', []):
-            bookmaker_key = bookmaker['key']
-            last_update = bookmaker['last_update']
             for market in bookmaker.get('markets', []):
-                if market['key'] == 'h2h':
-                    outcomes = market['outcomes']
-                    record = {
-                        'home_team': home_team,
-                        'away_team': away_team,
-                        'bookmaker': bookmaker_key,
-                        'last_update': last_update,
-                        'date': date,
-                    }
-                    for outcome in outcomes:
-                        if outcome['name'] == home_team:
-                            record['home_win'] = outcome['price']
-                        elif outcome['name'] == away_team:
-                            record['away_win'] = outcome['price']
-                        elif outcome['name'].lower() == 'draw':
-                            record['draw'] = outcome['price']
-                    odds_records.append(record)
-    O_fix = pd.DataFrame(odds_records)
-    O_fix['date'] = pd.to_datetime(O_fix['date'])
+                r = len(rec_event)
+                rec_event.append(e)
+                rec_bookmaker.append(bookmaker['key'])
+                rec_market.append(market['key'])
+                rec_last_update.append(bookmaker['last_update'])
+                for outcome in market['outcomes']:
+                    out_record.append(r)
+                    out_name.append(outcome['name'])
+                    out_price.append(outcome['price'])
+                    out_point.append(outcome.get('point'))
+
+    event_ids = pd.Categorical.from_codes(np.arange(len(ev_id)), categories=pd.Index(ev_id, dtype=object))
+    fixtures = pd.DataFrame({
+        'event_id': event_ids,
+        'sport': ev_sport,
+        'sport_key': pd.Categorical(ev_sport_key),
+        'home_team': pd.Categorical(ev_home),
+        'away_team': pd.Categorical(ev_away),
+        'date': _parse_commence_dates(ev_time).values,
+    })
+
+    out_record = np.asarray(out_record, dtype=np.int64)
+    bookmakers = pd.Categorical(rec_bookmaker)
+    markets = pd.Categorical(rec_market)
+    last_update = pd.DatetimeIndex(pd.to_datetime(pd.Series(rec_last_update, dtype=object), utc=True))
+    quotes = pd.DataFrame({
+        'event_id': pd.Categorical.from_codes(np.asarray(rec_event, dtype=np.int64)[out_record],
+                                              dtype=event_ids.dtype),
+        'bookmaker': pd.Categorical.from_codes(bookmakers.codes[out_record], dtype=bookmakers.dtype),
+        'market': pd.Categorical.from_codes(markets.codes[out_record], dtype=markets.dtype),
+        'outcome': pd.Categorical(out_name),
+        'price': np.asarray(out_price, dtype=np.float32),
+        'point': np.asarray(out_point, dtype=np.float32),
+        'last_update': last_update[out_record],
+    })
+    metrics.observe('stage_rows', len(quotes), buckets=ROWS_BUCKETS, stage='parse')
+    return fixtures, quotes
+
+@timed('pivot')
+def h2h_frames(fixtures, quotes):
+    """Builds the fixture (X_fix) and h2h odds (O_fix) frames from normalize_quotes output.
+
+    Only head-to-head fixtures are kept. Each (event, bookmaker) h2h market
+    becomes one O_fix row, its outcomes matched against the fixture's teams
+    (home first) and pivoted into home/draw/away prices.
+    """
+    matchup = (fixtures['home_team'].notna() & fixtures['away_team'].notna()).to_numpy()
+    X_fix = fixtures.loc[matchup, ['sport', 'home_team', 'away_team', 'date', 'event_id', 'sport_key']]
+    X_fix = X_fix.reset_index(drop=True)
+    X_fix['event_id'] = X_fix['event_id'].astype(str)
+    X_fix['sport_key'] = X_fix['sport_key'].cat.remove_unused_categories()
+
+    event = quotes['event_id'].cat.codes.to_numpy()
+    h2h = (quotes['market'] == 'h2h').to_numpy() & matchup[event]
+    quotes, event = quotes[h2h], event[h2h]
+
+    # One record per (event, bookmaker), in order of first appearance
+    n_bookmakers = len(quotes['bookmaker'].cat.categories) + 1
+    key = event.astype(np.int64) * n_bookmakers + quotes['bookmaker'].cat.codes.to_numpy()
+    record, _ = pd.factorize(key)
+    first = np.unique(record, return_index=True)[1]
+    rows = event[first]
+
+    # Match outcome names against each fixture's teams via the outcome category codes
+    names = quotes['outcome'].cat.categories
+    home_code = names.get_indexer(fixtures['home_team'].astype(object))
+    away_code = names.get_indexer(fixtures['away_team'].astype(object))
+    draw_names = np.asarray(names.str.lower() == 'draw', dtype=bool)
+    code = quotes['outcome'].cat.codes.to_numpy()
+    known = code >= 0
+    is_home = known & (code == home_code[event])
+    is_away = known & (code == away_code[event])
+    is_draw = known & draw_names[np.where(known, code, 0)]
+    column = np.select([is_home, is_away, is_draw], [0, 2, 1], default=-1)
+
+    prices = np.full((len(first), len(H2H_OUTCOMES)), np.nan)
+    matched = column >= 0
+    prices[record[matched], column[matched]] = widen_prices(quotes['price'].to_numpy()[matched])
+
+    home = fixtures['home_team'].array
+    away = fixtures['away_team'].array
+    O_fix = pd.DataFrame({
+        'date': fixtures['date'].to_numpy()[rows],
+        'home_team': pd.Categorical.from_codes(home.codes[rows], dtype=home.dtype),
+        'away_team': pd.Categorical.from_codes(away.codes[rows], dtype=away.dtype),
+        'event_id': np.asarray(fixtures['event_id'].cat.categories, dtype=object)[rows],
+        'sport_key': pd.Categorical(fixtures['sport_key'].to_numpy(dtype=object)[rows]),
+        'bookmaker': pd.Categorical(quotes['bookmaker'].to_numpy(dtype=object)[first]),
+        'last_update': quotes['last_update'].iloc[first].reset_index(drop=True),
+    })
+    for i, name in enumerate(H2H_OUTCOMES):
+        O_fix[name] = prices[:, i]
     O_fix.set_index(['date', 'home_team', 'away_team'], inplace=True)
     O_fix.sort_index(inplace=True)
-    return O_fix
+    metrics.observe('stage_rows', len(O_fix), buckets=ROWS_BUCKETS, stage='pivot')
+    return X_fix, O_fix
+
+def normalize_events(events):
+    """Flattens events into the fixture (X_fix) and h2h odds (O_fix) frames.
+
+    Equivalent to h2h_frames(*normalize_quotes(events)): the nested JSON is
+    walked once, and timestamp parsing, outcome matching and the pivot into
+    home/draw/away prices are batch array operations. Team and bookmaker
+    columns are categorical.
+    """
+    return h2h_frames(*normalize_quotes(events))
+
+def prepare_fixture_data(events):
+    """Formats fixture data from events."""
+    return normalize_events(events)[0]
+
+def prepare_odds_data(events):
+    """Formats odds data from events."""
+    return normalize_events(events)[1]
 
 def calculate_implied_probability(odds):
-    """Calculates implied probability from odds."""
-    return 1 / odds if odds > 0 else 0
+    """Calculates implied probability from odds.
+
+    Accepts a single price or an array of prices; missing or non-positive
+    prices map to 0.
+    """
+    if np.ndim(odds) == 0:
+        return 1 / odds if odds > 0 else 0
+    odds = np.asarray(odds, dtype=float)
+    return np.divide(1.0, odds, out=np.zeros_like(odds), where=odds > 0)
 
 def map_market(row):
     """Creates a bet description based on the market."""
@@ -203,91 +556,258 @@ def map_market(row):
         return "Bet on a Draw"
     return "Unknown Bet"
 
-def recommend_bets_based_on_current_odds(O_fix, total_funds, max_bets):
-    """Generates bet recommendations based on current odds."""
+def describe_bets(bets):
+    """Builds bet descriptions for a frame of bets (vectorized map_market).
+
+    Bets from O_fix name their h2h outcome in market (home_win, draw,
+    away_win); bets from quotes carry the market key, outcome and point.
+    """
+    market = bets['market'].astype(object)
+    descriptions = pd.Series('Unknown Bet', index=bets.index, dtype=object)
+    descriptions = descriptions.mask(market == 'home_win', 'Bet on ' + bets['home_team'].astype(str) + ' to win')
+    descriptions = descriptions.mask(market == 'away_win', 'Bet on ' + bets['away_team'].astype(str) + ' to win')
+    descriptions = descriptions.mask(market == 'draw', 'Bet on a Draw')
+    if 'outcome' in bets.columns:
+        outcome = bets['outcome'].astype(str)
+        point = pd.Series(widen_prices(bets['point']), index=bets.index)
+        is_draw = outcome.str.lower() == 'draw'
+        descriptions = descriptions.mask((market == 'h2h') & ~is_draw, 'Bet on ' + outcome + ' to win')
+        descriptions = descriptions.mask((market == 'h2h') & is_draw, 'Bet on a Draw')
+        descriptions = descriptions.mask(market == 'spreads', 'Bet on ' + outcome + ' ' + point.map('{:+g}'.format))
+        descriptions = descriptions.mask(market == 'totals', 'Bet ' + outcome + ' ' + point.map('{:g}'.format))
+        descriptions = descriptions.mask(market == 'outrights', 'Bet on ' + outcome + ' to win outright')
+    return descriptions
+
+def _sort_key(column):
+    """Sorts categorical columns by their values rather than by category order."""
+    return column.astype(object) if isinstance(column.dtype, pd.CategoricalDtype) else column
+
+def sort_best_bets(bets):
+    """Sorts bets by odds ascending, breaking ties by date, teams, bookmaker and outcome.
+
+    Categories follow first appearance in a poll, so ties are broken by
+    value to give the same order whatever the polling history.
+    """
+    return bets.sort_values(['odds', 'date', 'home_team', 'away_team', 'bookmaker', 'market'],
+                            kind='mergesort', key=_sort_key)
+
+def best_bet_per_game(O_fix):
+    """Returns the lowest-odds bet for every game, sorted by odds ascending (see sort_best_bets)."""
     O_flat = O_fix.reset_index()
-    O_melted = O_flat.melt(id_vars=['date', 'home_team', 'away_team', 'bookmaker', 'last_update'],
-                           value_vars=['home_win', 'draw', 'away_win'],
+    O_melted = O_flat.melt(id_vars=['date', 'home_team', 'away_team', 'event_id', 'sport_key', 'bookmaker', 'last_update'],
+                           value_vars=H2H_OUTCOMES,
                            var_name='market',
                            value_name='odds')
     O_melted.dropna(subset=['odds'], inplace=True)
-    O_sorted = O_melted.sort_values(by='odds', ascending=True)
+    O_sorted = sort_best_bets(O_melted)
+    return O_sorted.drop_duplicates(subset=['date', 'home_team', 'away_team'], keep='first')
 
-    unique_games = []
-    top_bets = []
+def _with_fixtures(fixtures, quotes):
+    """Prefixes quote rows with the date, teams, league and sport of their event."""
+    details = fixtures.iloc[quotes['event_id'].cat.codes.to_numpy()].reset_index(drop=True)
+    details = details[['date', 'home_team', 'away_team', 'event_id', 'sport_key', 'sport']]
+    rows = quotes.drop(columns=['event_id', 'price'], errors='ignore').reset_index(drop=True)
+    return pd.concat([details, rows], axis=1)
 
-    for _, row in O_sorted.iterrows():
-        game = (row['date'], row['home_team'], row['away_team'])
-        if game not in unique_games:
-            unique_games.append(game)
-            top_bets.append(row)
-            if len(top_bets) == max_bets:
-                break
+def best_bet_per_event(fixtures, quotes):
+    """Returns the lowest-odds quote of every event across all its markets, sorted by odds ascending."""
+    odds = widen_prices(quotes['price'].to_numpy())
+    priced = quotes.assign(odds=odds)[~np.isnan(odds)]
+    picks = (priced.sort_values('odds', ascending=True, kind='mergesort')
+                   .drop_duplicates(subset=['event_id'], keep='first'))
+    return _with_fixtures(fixtures, picks)
+
+def recommend_bets_based_on_current_odds(O_fix, total_funds, max_bets):
+    """Generates bet recommendations based on current odds."""
+    return recommend_from_candidates(best_bet_per_game(O_fix), total_funds, max_bets)
 
-    if len(top_bets) < max_bets:
-        logging.warning(f"Only {len(top_bets)} unique games available.")
-        print(f"\nOnly {len(top_bets)} unique games are available for betting out of the requested {max_bets} bets.")
-        print("Consider selecting another sport or reducing the number of bets.")
-        return top_bets
+def recommend_from_candidates(candidates, total_funds, max_bets):
+    """Picks and stakes the top max_bets from a best_bet_per_game candidate pool.
 
-    top_bets_df = pd.DataFrame(top_bets)
-    total_odds = top_bets_df['odds'].sum()
+    Stakes are proportional to the odds and rounded to exact cents that sum
+    to total_funds. When fewer games than max_bets are available, all of
+    them are staked.
+    """
+    top_bets_df = candidates.head(max_bets).reset_index(drop=True)
 
-    if total_odds == 0:
+    if len(top_bets_df) < max_bets:
+        logging.warning(f"Only {len(top_bets_df)} unique games available for {max_bets} requested bets.")
+
+    if top_bets_df.empty or top_bets_df['odds'].sum() == 0:
         logging.warning("No valid odds to recommend.")
         return []
 
-    top_bets_df['stake'] = (top_bets_df['odds'] / total_odds) * total_funds
-    top_bets_df['stake'] = top_bets_df['stake'].round(2)
-    total_allocated = top_bets_df['stake'].sum()
-    difference = round(total_funds - total_allocated, 2)
-    if not np.isclose(difference, 0):
-        top_bets_df.at[top_bets_df.index[-1], 'stake'] += difference
-
-    top_bets_df['bet_description'] = top_bets_df.apply(map_market, axis=1)
+    top_bets_df['stake'] = proportional_stakes(top_bets_df['odds'], total_funds)
+    top_bets_df['bet_description'] = describe_bets(top_bets_df)
     return top_bets_df.to_dict('records')
 
-def recommend_bets(X_fix, O_fix, available_funds, max_bets):
-    """Provides bet recommendations based on current odds."""
+def recommend_from_scan(scan, total_funds, max_bets, event_keys, exclusive_keys, kelly_fraction=DEFAULT_KELLY_FRACTION):
+    """Stakes the best prices of a value scan by fractional Kelly (see portfolio.kelly_portfolio)."""
+    bets = kelly_portfolio(scan, total_funds, max_bets, event_keys, exclusive_keys, kelly_fraction=kelly_fraction)
+    if bets.empty:
+        logging.warning("No bets with a positive edge to recommend.")
+        return []
+    bets['bet_description'] = describe_bets(bets)
+    return bets.to_dict('records')
+
+@timed('recommend')
+def recommend_bets(X_fix, O_fix, available_funds, max_bets, odds_book=None, fixtures=None, quotes=None,
+                   strategy='proportional', kelly_fraction=DEFAULT_KELLY_FRACTION):
+    """Provides bet recommendations based on current odds.
+
+    The 'proportional' strategy stakes the shortest-priced outcome of each
+    game in proportion to its odds; 'kelly' stakes the best available prices
+    by fractional Kelly against the consensus no-vig probabilities. When an
+    OddsBook already holding O_fix is given, its incrementally maintained
+    state is used instead of rescanning O_fix. With fixtures and quotes from
+    normalize_quotes, bets come from every market they hold (h2h, spreads,
+    totals and outrights).
+    """
+    if strategy not in STAKING_STRATEGIES:
+        raise ValueError(f"Unknown staking strategy '{strategy}'. Choose from {STAKING_STRATEGIES}.")
+
     # Current odds-based bets
-    current_bets = recommend_bets_based_on_current_odds(O_fix, available_funds, max_bets)
+    if strategy == 'kelly':
+        from value_scanner import GAME_KEYS, scan_prices, scan_quotes
+        if quotes is not None:
+            scan = scan_quotes(fixtures, quotes)
+            current_bets = recommend_from_scan(scan, available_funds, max_bets, ['event_id'],
+                                               ['event_id', 'market', 'line'], kelly_fraction)
+        else:
+            scan = scan_prices(odds_book.frame() if odds_book is not None else O_fix)
+            current_bets = recommend_from_scan(scan, available_funds, max_bets, GAME_KEYS, GAME_KEYS,
+                                               kelly_fraction)
+    elif quotes is not None:
+        current_bets = recommend_from_candidates(best_bet_per_event(fixtures, quotes), available_funds, max_bets)
+    elif odds_book is not None:
+        current_bets = odds_book.recommend(available_funds, max_bets)
+    else:
+        current_bets = recommend_bets_based_on_current_odds(O_fix, available_funds, max_bets)
 
     return {
         'current_bets': current_bets
     }
 
-def display_current_odds_df(X_fix, O_fix):
-    """Returns a DataFrame showing the current odds for upcoming events."""
-    odds_list = []
-    for _, row in X_fix.iterrows():
-        date = row['date']
-        home = row['home_team']
-        away = row['away_team']
-        try:
-            odds = O_fix.loc[(row['date'], home, away)]
-            if isinstance(odds, pd.Series):
-                odds = pd.DataFrame([odds])
-            for _, info in odds.iterrows():
-                bet = {
-                    'Date': date,
-                    'Match': f"{home} vs {away}",
-                    'Bookmaker': info.get('bookmaker', 'N/A'),
-                    'Home Win Odds': info.get('home_win', 'N/A'),
-                    'Draw Odds': info.get('draw', 'N/A') if 'draw' in info else 'N/A',
-                    'Away Win Odds': info.get('away_win', 'N/A'),
-                }
-                odds_list.append(bet)
-        except KeyError:
-            bet = {
-                'Date': date,
-                'Match': f"{home} vs {away}",
-                'Bookmaker': 'N/A',
-                'Home Win Odds': 'N/A',
-                'Draw Odds': 'N/A',
-                'Away Win Odds': 'N/A',
-            }
-            odds_list.append(bet)
-    return pd.DataFrame(odds_list)
+# Display names for the per-bookmaker odds tables
+ODDS_DISPLAY_COLUMNS = {
+    'date': 'Date',
+    'home_team': 'Home Team',
+    'away_team': 'Away Team',
+    'home_win': 'Home Win Odds',
+    'draw': 'Draw Odds',
+    'away_win': 'Away Win Odds',
+}
+
+def bookmaker_odds_views(O_fix):
+    """Splits O_fix into display-ready odds tables keyed by bookmaker, in one grouping pass."""
+    O_flat = O_fix.reset_index()
+    display = O_flat[list(ODDS_DISPLAY_COLUMNS)].rename(columns=ODDS_DISPLAY_COLUMNS)
+    groups = display.groupby(O_flat['bookmaker'].astype(str).to_numpy(), sort=True)
+    return {bookmaker: frame.reset_index(drop=True) for bookmaker, frame in groups}
+
+# Display names for each h2h outcome in the wide odds layout
+OUTCOME_DISPLAY_NAMES = {'home_win': 'Home Win', 'draw': 'Draw', 'away_win': 'Away Win'}
+
+def _join_fixture_odds(X_fix, O_fix):
+    """Left-joins every fixture to its odds rows, keeping fixtures without odds."""
+    keys = ['date', 'home_team', 'away_team']
+    fixtures = X_fix[keys].astype({'home_team': str, 'away_team': str})
+    odds = O_fix.reset_index()[keys + ['bookmaker'] + H2H_OUTCOMES]
+    odds = odds.astype({'home_team': str, 'away_team': str, 'bookmaker': str})
+    merged = fixtures.merge(odds, on=keys, how='left', sort=False)
+    merged['Match'] = merged['home_team'] + ' vs ' + merged['away_team']
+    return merged
+
+@timed('display')
+def display_current_odds_df(X_fix, O_fix, wide=False):
+    """Returns a DataFrame showing the current odds for upcoming events.
+
+    The default long layout has one row per fixture and bookmaker, with 'N/A'
+    rows for fixtures that have no odds. With wide=True there is one row per
+    fixture outcome, one column per bookmaker, and the best price and the
+    bookmaker offering it.
+    """
+    merged = _join_fixture_odds(X_fix, O_fix)
+    if wide:
+        return _wide_odds_df(merged)
+
+    unmatched = merged['bookmaker'].isna()
+    table = pd.DataFrame({
+        'Date': merged['date'],
+        'Match': merged['Match'],
+        'Bookmaker': merged['bookmaker'].where(~unmatched, 'N/A'),
+        'Home Win Odds': merged['home_win'],
+        'Draw Odds': merged['draw'],
+        'Away Win Odds': merged['away_win'],
+    })
+    if unmatched.any():
+        odds_columns = ['Home Win Odds', 'Draw Odds', 'Away Win Odds']
+        table[odds_columns] = table[odds_columns].astype(object)
+        table.loc[unmatched, odds_columns] = 'N/A'
+    return table
+
+def _wide_odds_df(merged):
+    """Pivots joined fixture odds to one column per bookmaker and adds the best price."""
+    merged = merged.drop_duplicates(subset=['date', 'Match', 'bookmaker'], keep='last')
+    long = merged.melt(id_vars=['date', 'Match', 'bookmaker'], value_vars=H2H_OUTCOMES,
+                       var_name='Outcome', value_name='odds')
+    long['Outcome'] = pd.Categorical(long['Outcome'].map(OUTCOME_DISPLAY_NAMES),
+                                     categories=list(OUTCOME_DISPLAY_NAMES.values()), ordered=True)
+    long['bookmaker'] = long['bookmaker'].fillna('N/A')
+    wide = long.pivot_table(index=['date', 'Match', 'Outcome'], columns='bookmaker', values='odds',
+                            aggfunc='first', observed=True, sort=False, dropna=False)
+    wide = wide.drop(columns='N/A', errors='ignore').dropna(how='all')
+    wide.columns.name = None
+
+    # Fixtures without any odds still get a row
+    fixtures = merged[['date', 'Match']].drop_duplicates()
+    missing = fixtures[~fixtures.set_index(['date', 'Match']).index.isin(wide.index.droplevel('Outcome'))]
+
+    bookmakers = sorted(wide.columns)
+    wide = wide[bookmakers]
+    prices = wide.to_numpy(dtype=float)
+    has_price = ~np.isnan(prices).all(axis=1)
+    best = np.full(len(wide), np.nan)
+    best_bookmaker = np.full(len(wide), 'N/A', dtype=object)
+    if has_price.any():
+        best[has_price] = np.nanmax(prices[has_price], axis=1)
+        best_bookmaker[has_price] = np.asarray(bookmakers, dtype=object)[np.nanargmax(prices[has_price], axis=1)]
+    wide['Best Odds'] = best
+    wide['Best Bookmaker'] = best_bookmaker
+    wide = wide.reset_index().rename(columns={'date': 'Date'})
+    wide['Outcome'] = wide['Outcome'].astype(str)
+
+    if len(missing):
+        empty = missing.rename(columns={'date': 'Date'}).assign(**{'Outcome': 'N/A', 'Best Bookmaker': 'N/A'})
+        wide = pd.concat([wide, empty], ignore_index=True)
+    return wide
+
+def quotes_table(fixtures, quotes, markets=None):
+    """Returns a display table of quotes with one row per bookmaker outcome.
+
+    markets restricts the table to the given market keys. Outright events
+    are labelled with their sport title instead of a matchup.
+    """
+    if markets is not None:
+        quotes = quotes[quotes['market'].isin(markets)]
+    rows = _with_fixtures(fixtures, quotes.assign(odds=widen_prices(quotes['price'].to_numpy())))
+    matchup = rows['home_team'].astype(str) + ' vs ' + rows['away_team'].astype(str)
+    table = pd.DataFrame({
+        'Date': rows['date'],
+        'Event': matchup.where(rows['home_team'].notna(), rows['sport'].astype(str)),
+        'Market': rows['market'].astype(str),
+        'Bookmaker': rows['bookmaker'].astype(str),
+        'Outcome': rows['outcome'].astype(str),
+        'Point': widen_prices(rows['point']),
+        'Odds': rows['odds'],
+    })
+    return table.sort_values(['Date', 'Event', 'Market', 'Bookmaker'], kind='mergesort').reset_index(drop=True)
+
+def highlight_best_prices(wide_odds, color='#FFD8B3'):
+    """Styles a wide odds table so each row's best bookmaker price is highlighted."""
+    bookmakers = [c for c in wide_odds.columns
+                  if c not in ('Date', 'Match', 'Outcome', 'Best Odds', 'Best Bookmaker')]
+    return wide_odds.style.highlight_max(subset=bookmakers, axis=1, color=color)
 
 def main():
     """Runs the betting recommendation workflow."""
@@ -296,8 +816,8 @@ def main():
 
     # Check if running as a script with 'cli' argument
     if len(sys.argv) > 1 and sys.argv[1] == 'cli':
-        # Implement command-line interface here if needed
-        pass
+        from cli import main as cli_main
+        sys.exit(cli_main(sys.argv[2:]))
     else:
         # Prevent automatic execution when imported
         pass
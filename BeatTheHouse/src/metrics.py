@@ -0,0 +1,213 @@
+# metrics.py
+
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Metrics are only recorded when METRICS_ENABLED is set; METRICS_PORT also serves them over HTTP
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+METRICS_PREFIX = 'beatthehouse_'
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+ROWS_BUCKETS = (10, 100, 1e3, 1e4, 1e5, 1e6, 1e7)
+
+# A disabled span is this shared no-op context, so instrumented code pays one attribute check
+_NOOP_SPAN = nullcontext()
+
+
+class Histogram:
+    """Fixed-bucket histogram with a running count, sum and maximum."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """Records one value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+
+class _Span:
+    """Times a block of code into the stage_seconds histogram."""
+
+    __slots__ = ('registry', 'labels', 'started')
+
+    def __init__(self, registry, labels):
+        self.registry = registry
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe('stage_seconds', time.perf_counter() - self.started, **self.labels)
+        if exc_type is not None:
+            self.registry.inc('stage_errors_total', **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms, rendered in the Prometheus text format.
+
+    Every recording method returns immediately while the registry is
+    disabled, so instrumentation can stay on the hot paths.
+    """
+
+    def __init__(self, enabled=METRICS_ENABLED, prefix=METRICS_PREFIX):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """Adds value to a counter."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        """Records value in a histogram, created with buckets on first use."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def span(self, stage, **labels):
+        """Returns a context manager timing its block as stage_seconds{stage=...}."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, dict(labels, stage=stage))
+
+    def reset(self):
+        """Drops every recorded value."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def summary(self):
+        """Returns one dict per series (metric, labels, count, total, mean, max) for display."""
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = [(key, h.count, h.sum, h.max) for key, h in self._histograms.items()]
+        rows = [{'metric': name, 'labels': _format_labels(labels), 'count': value, 'total': value,
+                 'mean': None, 'max': None}
+                for (name, labels), value in counters]
+        rows += [{'metric': name, 'labels': _format_labels(labels), 'count': count, 'total': total,
+                  'mean': total / count if count else None, 'max': maximum}
+                 for (name, labels), count, total, maximum in histograms]
+        return sorted(rows, key=lambda row: (row['metric'], row['labels']))
+
+    def render_prometheus(self):
+        """Renders every series in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(h.counts), h.count, h.sum, h.buckets)
+                                for key, h in self._histograms.items())
+        lines, typed = [], set()
+        for (name, labels), value in counters:
+            metric = self.prefix + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(labels)} {value}")
+        for (name, labels), counts, count, total, buckets in histograms:
+            metric = self.prefix + name
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f"{metric}_bucket{_format_labels(labels + (('le', _format_bound(bound)),))} {cumulative}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_bound(bound):
+    """Formats a bucket bound the way Prometheus clients do (1.0 -> '1.0', 1e3 -> '1000.0')."""
+    return bound if isinstance(bound, str) else repr(float(bound))
+
+
+def _format_labels(labels):
+    """Formats (name, value) label pairs as {name="value",...}."""
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+# Process-wide registry used by every instrumented module
+metrics = MetricsRegistry()
+
+
+def timed(stage):
+    """Decorator timing every call of a function as stage_seconds{stage=...} while metrics are enabled."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return func(*args, **kwargs)
+            with metrics.span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT, host='127.0.0.1', registry=metrics):
+    """Serves registry at http://host:port/metrics from a daemon thread; returns the server.
+
+    Calling it again returns the running server. Does nothing when port is 0.
+    """
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        _server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+        logging.info(f"Serving metrics at http://{host}:{port}/metrics.")
+        return _server
@@ -0,0 +1,143 @@
+# odds_book.py
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from main import H2H_OUTCOMES, best_bet_per_game, recommend_from_candidates, sort_best_bets
+from metrics import timed
+
+BOOK_KEYS = ['event_id', 'bookmaker', 'market']
+FIXTURE_KEYS = ['date', 'home_team', 'away_team']
+
+
+def _event_mask(index, event_ids):
+    """Flags rows of a BOOK_KEYS index whose event_id is in event_ids.
+
+    Membership is tested once per distinct event rather than once per row.
+    """
+    index = index.remove_unused_levels()
+    level_mask = index.levels[0].isin(pd.Index(event_ids).unique())
+    return level_mask[index.codes[0]]
+
+
+class OddsBook:
+    """Incrementally maintained odds state keyed by (event_id, bookmaker, market).
+
+    Each poll's O_fix is applied with apply(): only rows whose bookmaker
+    last_update moved replace the stored state, and the price moves they carry
+    are returned as a change set. The per-game recommendation candidates are
+    recomputed only for fixtures touched by the poll.
+    """
+
+    def __init__(self):
+        self._state = None
+        self._candidates = None
+        self.version = 0  # incremented whenever a poll changes the book
+
+    @timed('odds_book')
+    def apply(self, O_fix, prune=True, polled=None):
+        """Applies a poll and returns the change set of price moves.
+
+        The change set has one row per (event, bookmaker, outcome) whose price
+        changed, with old_odds (NaN for newly listed prices) and new_odds (NaN
+        for removed prices). With prune=True, (event, bookmaker) rows of the
+        polled sport_keys that are missing from the poll are dropped from the
+        book, whether the whole event ended or only the bookmaker pulled its
+        market. polled lists the leagues fetched successfully, so a league
+        that came back with no events is emptied; it defaults to the
+        sport_keys present in O_fix.
+        """
+        incoming = O_fix.reset_index()
+        incoming['market'] = 'h2h'
+        incoming = incoming.set_index(BOOK_KEYS)
+        incoming = incoming[~incoming.index.duplicated(keep='last')]
+
+        if self._state is None:
+            self._state = incoming
+            new = incoming[H2H_OUTCOMES].to_numpy(dtype=float)
+            changes = self._price_moves(incoming, np.full_like(new, np.nan), new)
+            self._refresh_candidates(incoming.index.get_level_values('event_id').unique())
+            self.version += 1
+            logging.info(f"Odds book initialised with {len(incoming)} rows.")
+            return changes
+
+        previous = self._state.reindex(incoming.index)
+        moved = previous['last_update'].isna().to_numpy() | (
+            incoming['last_update'] > previous['last_update']).to_numpy()
+        updated = incoming[moved]
+
+        removed = self._state.iloc[:0]
+        if prune:
+            polled = incoming['sport_key'].unique() if polled is None else list(polled)
+            in_polled = self._state['sport_key'].isin(polled).to_numpy()
+            missing = ~self._state.index.isin(incoming.index)
+            removed = self._state[in_polled & missing]
+
+        old = previous[moved][H2H_OUTCOMES].to_numpy(dtype=float)
+        gone = removed[H2H_OUTCOMES].to_numpy(dtype=float)
+        changes = pd.concat([
+            self._price_moves(updated, old, updated[H2H_OUTCOMES].to_numpy(dtype=float)),
+            self._price_moves(removed, gone, np.full_like(gone, np.nan)),
+        ], ignore_index=True)
+        if updated.empty and removed.empty:
+            return changes
+
+        keep = self._state[~self._state.index.isin(updated.index) & ~self._state.index.isin(removed.index)]
+        self._state = pd.concat([keep, updated])
+
+        affected = updated.index.get_level_values('event_id').union(removed.index.get_level_values('event_id'))
+        self._refresh_candidates(affected)
+        self.version += 1
+        logging.info(f"Odds book applied {len(updated)} updated and {len(removed)} removed rows "
+                     f"({len(changes)} price moves across {len(affected)} fixtures).")
+        return changes
+
+    def _price_moves(self, rows, old, new):
+        """Lists per-outcome price differences between the old and new price arrays of rows."""
+        differs = ~((old == new) | (np.isnan(old) & np.isnan(new)))
+        row_idx, col_idx = np.nonzero(differs)
+        info = rows.reset_index().iloc[row_idx]
+        return pd.DataFrame({
+            'event_id': info['event_id'].to_numpy(),
+            'date': info['date'].to_numpy(),
+            'home_team': info['home_team'].astype(object).to_numpy(),
+            'away_team': info['away_team'].astype(object).to_numpy(),
+            'bookmaker': info['bookmaker'].astype(object).to_numpy(),
+            'market': np.asarray(H2H_OUTCOMES, dtype=object)[col_idx],
+            'old_odds': old[row_idx, col_idx],
+            'new_odds': new[row_idx, col_idx],
+            'last_update': info['last_update'].to_numpy(),
+        })
+
+    def _refresh_candidates(self, event_ids):
+        """Recomputes the best bet of the given fixtures and splices it into the candidate pool."""
+        fresh = best_bet_per_game(self.frame(self._state[_event_mask(self._state.index, event_ids)]))
+        fresh = fresh.set_index('event_id', drop=False)
+        if self._candidates is None:
+            self._candidates = fresh
+        else:
+            kept = self._candidates[~self._candidates.index.isin(event_ids)]
+            self._candidates = pd.concat([kept, fresh])
+
+    def frame(self, state=None):
+        """Returns the book (or a slice of it) in the O_fix layout."""
+        state = self._state if state is None else state
+        if state is None:
+            return None
+        O_fix = state.reset_index().drop(columns='market').set_index(FIXTURE_KEYS)
+        return O_fix.sort_index()
+
+    def best_bets(self):
+        """Returns the best bet of every fixture in the book in best_bet_per_game order."""
+        if self._candidates is None:
+            return None
+        return sort_best_bets(self._candidates).reset_index(drop=True)
+
+    def recommend(self, total_funds, max_bets):
+        """Generates bet recommendations from the incrementally maintained candidates."""
+        return recommend_from_candidates(self.best_bets(), total_funds, max_bets)
+
+    def __len__(self):
+        return 0 if self._state is None else len(self._state)
@@ -0,0 +1,123 @@
+# odds_cache.py
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Call:
+    """One in-flight load whose result is shared with concurrent callers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class OddsCache:
+    """Thread-safe TTL cache with LRU eviction for Odds API responses.
+
+    Entries younger than ``ttl`` seconds are served as-is. Entries older than
+    ``ttl`` but younger than ``ttl + stale_ttl`` are served immediately while a
+    background thread refreshes them (stale-while-revalidate). Anything older
+    is reloaded synchronously. Concurrent loads of the same key share a single
+    loader() call.
+    """
+
+    def __init__(self, ttl=60.0, maxsize=128, stale_ttl=0.0):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # key -> (value, fetched_at)
+        self._refreshing = set()
+        self._inflight = {}  # key -> _Call shared by every caller waiting on that load
+        self._lock = threading.Lock()
+
+    def get(self, key, loader):
+        """Returns the cached value for key, calling loader() when it is missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self._start_refresh(key, loader)
+                    return value
+
+        return self.load(key, loader)
+
+    def load(self, key, loader):
+        """Calls loader() and caches its value, sharing one call among concurrent callers of key."""
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = loader()
+            self.set(key, call.value)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+        return call.value
+
+    def set(self, key, value):
+        """Stores value under key, evicting the least recently used entries if full."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drops one key, or every entry when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def load_async(self, key, loader):
+        """Loads key in a background thread unless a load for it is already running."""
+        with self._lock:
+            self._start_refresh(key, loader)
+
+    def _start_refresh(self, key, loader):
+        """Starts a background refresh of key; the caller must hold the lock."""
+        if key not in self._refreshing:
+            self._refreshing.add(key)
+            threading.Thread(target=self._refresh, args=(key, loader), daemon=True).start()
+
+    def _refresh(self, key, loader):
+        """Reloads a stale entry in the background, keeping the old value on failure."""
+        try:
+            self.load(key, loader)
+        except Exception as e:
+            logging.warning(f"Background refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,166 @@
+# portfolio.py
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+STAKING_STRATEGIES = ('proportional', 'kelly')
+DEFAULT_KELLY_FRACTION = 0.5
+# No single bet may take more than this share of the funds
+MAX_STAKE_FRACTION = 0.25
+
+
+def round_to_cents(amounts, total=None):
+    """Rounds amounts to whole cents that sum exactly to total (default: their own sum, rounded).
+
+    Every amount is floored to a cent and the leftover cents go to the
+    largest remainders (largest-remainder method), so no single bet absorbs
+    the rounding drift. A total further from the amounts' sum than one cent
+    per amount is reached in whole rounds of one cent each; no amount goes
+    below zero.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    if not len(amounts):
+        return amounts
+    cents = amounts * 100
+    target = int(round(cents.sum() if total is None else total * 100))
+    floored = np.floor(cents + 1e-9)
+    remainder = cents - floored
+    leftover = target - int(floored.sum())
+    if leftover > 0:
+        order = np.argsort(-remainder, kind='mergesort')
+        floored += leftover // len(order)
+        floored[order[:leftover % len(order)]] += 1
+    while leftover < 0 and (floored > 0).any():
+        order = np.argsort(np.where(floored > 0, remainder, np.inf), kind='mergesort')
+        order = order[:min(-leftover, int((floored > 0).sum()))]
+        floored[order] -= 1
+        leftover += len(order)
+    return floored / 100
+
+
+def proportional_stakes(odds, total_funds):
+    """Splits total_funds across bets in proportion to their odds, in exact cents."""
+    odds = np.asarray(odds, dtype=float)
+    total_odds = odds.sum()
+    if not len(odds) or total_odds <= 0:
+        return np.zeros(len(odds))
+    return round_to_cents(odds / total_odds * total_funds, total_funds)
+
+
+def exclusive_kelly(probability, odds, group):
+    """Full-Kelly bankroll fractions for groups of mutually exclusive outcomes.
+
+    Outcomes sharing a group code (e.g. home/draw/away of one game) cannot
+    win together, so each group is solved jointly with the exact algorithm
+    of Smoczynski and Tomkins: outcomes are taken in decreasing order of
+    probability * odds while that exceeds the reserve rate
+    R = (1 - sum p) / (1 - sum 1/odds) of the outcomes already taken, and
+    each taken outcome gets p - R / odds. All groups are solved at once with
+    sorted cumulative sums.
+    """
+    probability = np.asarray(probability, dtype=float)
+    odds = np.asarray(odds, dtype=float)
+    group = np.asarray(group)
+    fractions = np.zeros(len(odds))
+    idx = np.flatnonzero((probability > 0) & (odds > 1) & np.isfinite(probability) & np.isfinite(odds))
+    if not len(idx):
+        return fractions
+
+    edge = probability[idx] * odds[idx]
+    order = idx[np.lexsort((-edge, group[idx]))]
+    p, inv = probability[order], 1 / odds[order]
+    g = group[order]
+    starts = np.r_[True, g[1:] != g[:-1]]
+    segment = np.cumsum(starts) - 1
+
+    # Cumulative sums restarted at every group
+    cum_p = np.cumsum(p)
+    cum_inv = np.cumsum(inv)
+    cum_p -= (cum_p - p)[starts][segment]
+    cum_inv -= (cum_inv - inv)[starts][segment]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        reserve = (1 - cum_p) / (1 - cum_inv)
+    previous = np.where(starts, 1.0, np.r_[1.0, reserve[:-1]])
+
+    # Take the longest prefix of each group that keeps clearing the reserve rate
+    clears = (p / inv > previous) & (cum_inv < 1)
+    failures = np.cumsum(~clears)
+    taken = (failures - (failures - ~clears)[starts][segment]) == 0
+    last_taken = pd.Series(np.where(taken, np.arange(len(order)), -1)).groupby(segment).transform('max').to_numpy()
+    group_reserve = np.where(last_taken >= 0, reserve[np.maximum(last_taken, 0)], 1.0)
+    fractions[order] = np.where(taken, np.maximum(p - group_reserve * inv, 0.0), 0.0)
+    return fractions
+
+
+def expected_log_growth(probability, odds, fractions, group):
+    """Expected log growth of each group's stakes, one value per group code (0..max)."""
+    probability = np.asarray(probability, dtype=float)
+    odds = np.asarray(odds, dtype=float)
+    n_groups = int(group.max()) + 1 if len(group) else 0
+    staked = np.bincount(group, weights=fractions, minlength=n_groups)
+    covered = np.bincount(group, weights=np.where(fractions > 0, probability, 0.0), minlength=n_groups)
+    kept = 1 - staked
+    with np.errstate(divide='ignore', invalid='ignore'):
+        win = np.where(fractions > 0, probability * np.log(np.maximum(kept[group] + fractions * odds, 1e-12)), 0.0)
+        lose = np.where(covered < 1, (1 - covered) * np.log(np.maximum(kept, 1e-12)), 0.0)
+    return np.bincount(group, weights=win, minlength=n_groups) + lose
+
+
+def kelly_portfolio(bets, total_funds, max_bets, event_keys, exclusive_keys,
+                    kelly_fraction=DEFAULT_KELLY_FRACTION, max_stake_fraction=MAX_STAKE_FRACTION):
+    """Sizes stakes by fractional Kelly over candidate bets with win probabilities.
+
+    bets needs odds and fair_probability columns. Outcomes sharing
+    exclusive_keys are mutually exclusive and solved jointly (see
+    exclusive_kelly), considering at most the max_bets outcomes of each
+    group with the highest probability * odds. Different groups of the same
+    event (e.g. its spread and its total) are correlated, so only the group
+    with the highest expected log growth is kept per event. Events are then taken in decreasing order
+    of growth while their bets fit within max_bets, each stake is scaled by
+    kelly_fraction and capped at max_stake_fraction of the funds, the total
+    is kept within total_funds, and stakes are rounded to exact cents.
+    Returns the bets with a positive stake and a stake column, best event
+    first.
+    """
+    columns = list(bets.columns) + ['stake']
+    if bets.empty or max_bets < 1:
+        return pd.DataFrame(columns=columns)
+    bets = bets.reset_index(drop=True)
+    probability = bets['fair_probability'].to_numpy(dtype=float)
+    odds = bets['odds'].to_numpy(dtype=float)
+    group = bets.groupby(exclusive_keys, observed=True, sort=False, dropna=False).ngroup().to_numpy()
+    event = bets.groupby(event_keys, observed=True, sort=False, dropna=False).ngroup().to_numpy()
+
+    # A group can hold at most max_bets bets, so only its max_bets best edges are considered
+    edge_rank = (pd.Series(probability * odds).groupby(group).rank(method='first', ascending=False)
+                   .fillna(np.inf).to_numpy())
+    probability = np.where(edge_rank <= max_bets, probability, np.nan)
+
+    fractions = exclusive_kelly(probability, odds, group)
+    growth = expected_log_growth(probability, odds, fractions, group)
+    positive = fractions > 0
+    if not positive.any():
+        logging.info("No bets with a positive Kelly stake.")
+        return pd.DataFrame(columns=columns)
+
+    # Keep the best group of every event, then whole events in order of growth
+    groups = pd.DataFrame({'group': group[positive], 'event': event[positive]}).drop_duplicates('group')
+    groups['growth'] = growth[groups['group'].to_numpy()]
+    groups['bets'] = np.bincount(group[positive], minlength=len(growth))[groups['group'].to_numpy()]
+    groups = (groups.sort_values('growth', ascending=False, kind='mergesort')
+                    .drop_duplicates('event', keep='first'))
+    groups = groups[groups['bets'].cumsum() <= max_bets]
+    rank = pd.Series(np.arange(len(groups)), index=groups['group'].to_numpy())
+
+    chosen = positive & np.isin(group, groups['group'].to_numpy())
+    picked = bets[chosen].copy()
+    stake_fraction = np.minimum(fractions[chosen] * kelly_fraction, max_stake_fraction)
+    if stake_fraction.sum() > 1:
+        stake_fraction /= stake_fraction.sum()
+    picked['stake'] = round_to_cents(stake_fraction * total_funds)
+    picked['_rank'] = rank.reindex(group[chosen]).to_numpy()
+    picked = picked[picked['stake'] > 0]
+    picked = picked.sort_values(['_rank', 'stake'], ascending=[True, False], kind='mergesort')
+    return picked.drop(columns='_rank').reset_index(drop=True)
@@ -0,0 +1,49 @@
+# quota.py
+
+import logging
+import threading
+import time
+
+
+class QuotaTracker:
+    """Tracks Odds API credit usage from the quota headers of each response.
+
+    The API reports x-requests-remaining, x-requests-used and
+    x-requests-last (the cost of the request just made) on every response.
+    """
+
+    def __init__(self):
+        self.remaining = None
+        self.used = None
+        self.last_cost = None
+        self.updated_at = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cost(regions, markets):
+        """Returns the credits one odds request costs: one per region per market."""
+        return len([r for r in regions.split(',') if r]) * len([m for m in markets.split(',') if m])
+
+    def update(self, headers):
+        """Records the quota headers of a response; responses without them are ignored."""
+        remaining = headers.get('x-requests-remaining')
+        if remaining is None:
+            return
+        with self._lock:
+            self.remaining = float(remaining)
+            self.used = float(headers.get('x-requests-used', self.used or 0))
+            last = headers.get('x-requests-last')
+            self.last_cost = float(last) if last is not None else self.last_cost
+            self.updated_at = time.time()
+        if self.remaining < 100:
+            logging.warning(f"Odds API quota low: {self.remaining:.0f} credits remaining.")
+
+    def snapshot(self):
+        """Returns the latest quota readings as a dict."""
+        with self._lock:
+            return {
+                'remaining': self.remaining,
+                'used': self.used,
+                'last_cost': self.last_cost,
+                'updated_at': self.updated_at,
+            }
@@ -0,0 +1,198 @@
+# scheduler.py
+
+import heapq
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+import requests
+
+from main import DEFAULT_MARKETS, DEFAULT_REGIONS, fetch_upcoming_events, league_markets, quota
+from metrics import start_metrics_server
+
+# Credits kept in hand for interactive use; polling pauses below this
+QUOTA_RESERVE = int(os.getenv('ODDS_QUOTA_RESERVE', '50'))
+
+# Poll interval multipliers by hours until a league's next game; leagues with
+# nothing scheduled are polled least often
+URGENCY_TIERS = [(1, 1), (6, 3), (24, 10)]
+DISTANT_MULTIPLIER = 30
+IDLE_MULTIPLIER = 60
+# A failed poll is retried after base_interval doubled per consecutive failure, up to this multiplier
+MAX_RETRY_MULTIPLIER = 30
+
+
+def next_quota_reset(now=None):
+    """Returns the epoch time of the next monthly quota reset (00:00 UTC on the 1st)."""
+    now = datetime.fromtimestamp(now if now is not None else time.time(), tz=timezone.utc)
+    year, month = (now.year + 1, 1) if now.month == 12 else (now.year, now.month + 1)
+    return datetime(year, month, 1, tzinfo=timezone.utc).timestamp()
+
+
+def _next_commence(events, now):
+    """Returns the epoch time of the earliest game in events that has not started, or None."""
+    times = pd.to_datetime([event.get('commence_time') for event in events], utc=True, errors='coerce')
+    upcoming = [t.timestamp() for t in times if not pd.isna(t) and t.timestamp() > now]
+    return min(upcoming) if upcoming else None
+
+
+class PollScheduler:
+    """Polls leagues at a rate that follows their commence times and the Odds API quota.
+
+    Each league is polled every base_interval seconds times a multiplier that
+    grows with the time until its next game, so leagues about to kick off are
+    refreshed first and most often. Every interval is then stretched by one
+    common factor whenever the combined credit spend per second would exhaust
+    the remaining quota (less reserve) before reset_at. Below the reserve,
+    polling pauses until the reset.
+    """
+
+    def __init__(self, sport_keys, base_interval=60.0, reset_at=None, reserve=QUOTA_RESERVE,
+                 regions=DEFAULT_REGIONS, markets=DEFAULT_MARKETS, quota_tracker=None, clock=time.time):
+        self.sport_keys = list(sport_keys)
+        self.base_interval = base_interval
+        self.reset_at = reset_at
+        self.reserve = reserve
+        self.regions = regions
+        self.markets = markets
+        self.quota = quota_tracker or quota
+        self.clock = clock
+        self.costs = {key: self.quota.cost(regions, league_markets(key, markets)) for key in self.sport_keys}
+        self._next_commence = {}  # sport_key -> epoch time of its next game, None when idle
+        self._failures = {}  # sport_key -> consecutive failed polls
+        now = clock()
+        # Unknown leagues start due immediately, in the given order
+        self._queue = [(now, i, key) for i, key in enumerate(self.sport_keys)]
+        heapq.heapify(self._queue)
+        self._order = len(self.sport_keys)
+
+    def _urgency(self, sport_key, now):
+        """Returns the interval multiplier for a league from the time until its next game."""
+        if sport_key not in self._next_commence:
+            return 1
+        commence = self._next_commence[sport_key]
+        if commence is None:
+            return IDLE_MULTIPLIER
+        hours = (commence - now) / 3600
+        for limit, multiplier in URGENCY_TIERS:
+            if hours <= limit:
+                return multiplier
+        return DISTANT_MULTIPLIER
+
+    def budget_scale(self, now=None):
+        """Returns the factor (>= 1) every interval is stretched by to stay within the quota.
+
+        With no credits left above the reserve, the factor pushes the base
+        interval out to the quota reset.
+        """
+        remaining = self.quota.remaining
+        if remaining is None:
+            return 1.0
+        now = now if now is not None else self.clock()
+        reset_at = self.reset_at or next_quota_reset(now)
+        allowed = max(remaining - self.reserve, 0) / max(reset_at - now, 1.0)
+        if allowed <= 0:
+            return max(1.0, (reset_at - now) / self.base_interval)
+        wanted = sum(self.costs[key] / (self.base_interval * self._urgency(key, now)) for key in self.sport_keys)
+        return max(1.0, wanted / allowed)
+
+    def _resume_at(self, now):
+        """Returns when a league paused at the reserve is polled again: the quota reset."""
+        return max(self.reset_at or next_quota_reset(now), now + self.base_interval)
+
+    def _affordable(self, sport_key):
+        """Checks whether polling sport_key keeps the quota at or above the reserve."""
+        remaining = self.quota.remaining
+        return remaining is None or remaining - self.costs[sport_key] >= self.reserve
+
+    def interval(self, sport_key, now=None):
+        """Returns the seconds until sport_key should be polled again."""
+        now = now if now is not None else self.clock()
+        return self.base_interval * self._urgency(sport_key, now) * self.budget_scale(now)
+
+    def next_due(self):
+        """Returns (due time, sport_key) of the next poll, or None when nothing is scheduled."""
+        if not self._queue:
+            return None
+        due, _, sport_key = self._queue[0]
+        return due, sport_key
+
+    def _schedule(self, sport_key, due):
+        """Queues sport_key to be polled at due."""
+        heapq.heappush(self._queue, (due, self._order, sport_key))
+        self._order += 1
+
+    def run_once(self):
+        """Polls the most overdue league and reschedules it.
+
+        Returns (sport_key, events); events is None when the poll was skipped
+        because the quota is down to the reserve, or failed. A failed league
+        keeps its schedule data and is retried with exponential backoff.
+        """
+        due, _, sport_key = heapq.heappop(self._queue)
+        now = self.clock()
+        if not self._affordable(sport_key):
+            logging.warning(f"Odds API quota at {self.quota.remaining:.0f} credits (reserve {self.reserve}); "
+                            f"pausing {sport_key} until the quota resets.")
+            self._schedule(sport_key, self._resume_at(now))
+            return sport_key, None
+
+        try:
+            events = fetch_upcoming_events(sport_key, self.regions, self.markets, use_cache=False, raise_errors=True)
+        except requests.RequestException as e:
+            failures = self._failures[sport_key] = self._failures.get(sport_key, 0) + 1
+            retry = self.base_interval * min(2 ** (failures - 1), MAX_RETRY_MULTIPLIER)
+            self._schedule(sport_key, self.clock() + retry)
+            logging.warning(f"Polling {sport_key} failed ({failures} in a row), retrying in {retry:.0f}s: {e}")
+            return sport_key, None
+        self._failures.pop(sport_key, None)
+        now = self.clock()
+        self._next_commence[sport_key] = _next_commence(events, now)
+        # A poll that brought the quota down to the reserve waits for the reset
+        interval = self.interval(sport_key, now) if self._affordable(sport_key) else self._resume_at(now) - now
+        self._schedule(sport_key, now + interval)
+        logging.info(f"Polled {sport_key}: {len(events)} events, next poll in {interval:.0f}s "
+                     f"({self.quota.remaining} credits remaining).")
+        return sport_key, events
+
+    def run(self, polls=None, on_events=None, sleep=time.sleep):
+        """Polls leagues as they fall due, passing (sport_key, events) to on_events.
+
+        Runs forever unless polls limits the number of polls.
+        """
+        count = 0
+        while self._queue and (polls is None or count < polls):
+            due, _ = self.next_due()
+            wait = due - self.clock()
+            if wait > 0:
+                sleep(wait)
+            sport_key, events = self.run_once()
+            if events is not None and on_events is not None:
+                on_events(sport_key, events)
+            count += 1
+
+
+def main():
+    """Polls the given leagues on a quota-aware schedule until interrupted."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Poll leagues within the Odds API quota.")
+    parser.add_argument('sport_keys', nargs='+', help="League keys to poll, e.g. soccer_epl")
+    parser.add_argument('--interval', type=float, default=60.0, help="Base seconds between polls (default 60)")
+    parser.add_argument('--reserve', type=int, default=QUOTA_RESERVE, help="Credits to keep in reserve")
+    parser.add_argument('--polls', type=int, help="Stop after this many polls")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    start_metrics_server()
+    scheduler = PollScheduler(args.sport_keys, base_interval=args.interval, reserve=args.reserve)
+    try:
+        scheduler.run(polls=args.polls)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
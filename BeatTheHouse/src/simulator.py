@@ -0,0 +1,160 @@
+# simulator.py
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from main import H2H_OUTCOMES, calculate_implied_probability
+
+PERCENTILES = [5, 25, 50, 75, 95]
+DEFAULT_CHUNK_SIZE = 20000
+
+
+def _h2h_outcome(bet):
+    """Returns a bet's outcome as a home_win/draw/away_win name, or None outside the h2h market."""
+    if bet.get('market') in H2H_OUTCOMES:
+        return bet['market']
+    if bet.get('market') != 'h2h':
+        return None
+    return {str(bet.get('home_team')): 'home_win', str(bet.get('away_team')): 'away_win',
+            'Draw': 'draw'}.get(str(bet.get('outcome')))
+
+
+def bet_probabilities(bets, O_fix=None):
+    """Returns the win probability of each recommended bet.
+
+    Bets that carry a fair_probability (Kelly bets) keep it. For the others,
+    with O_fix, the consensus no-vig h2h probability across bookmakers is
+    used; bets it cannot match, or all bets without O_fix, fall back to the
+    (vigged) implied probability of their own odds.
+    """
+    odds = np.array([bet['odds'] for bet in bets], dtype=float)
+    probabilities = calculate_implied_probability(odds)
+    carried = np.array([bet.get('fair_probability', np.nan) for bet in bets], dtype=float)
+    missing = np.isnan(carried)
+    if O_fix is None or not missing.any():
+        return np.where(missing, probabilities, carried)
+
+    from value_scanner import GAME_KEYS, scan_prices
+    scan = scan_prices(O_fix)
+    scan = scan.assign(**{key: scan[key].astype(str) for key in GAME_KEYS[1:]})
+    keys = pd.DataFrame({
+        'date': pd.to_datetime([bet['date'] for bet in bets]),
+        'home_team': [str(bet['home_team']) for bet in bets],
+        'away_team': [str(bet['away_team']) for bet in bets],
+        'market': [_h2h_outcome(bet) for bet in bets],
+    })
+    fair = keys.merge(scan[GAME_KEYS + ['market', 'fair_probability']], on=GAME_KEYS + ['market'], how='left')
+    fair = fair['fair_probability'].to_numpy(dtype=float)
+    return np.where(missing, np.where(np.isnan(fair), probabilities, fair), carried)
+
+
+def exclusive_groups(bets):
+    """Returns a group code per bet; bets sharing a code are outcomes of one market line that cannot win together.
+
+    Home, draw and away of a game share a group, as do both sides of a
+    spread or total line and every runner of an outright.
+    """
+    codes, groups = {}, []
+    for bet in bets:
+        event = bet.get('event_id')
+        if not isinstance(event, str) or not event:
+            event = (str(bet.get('date')), str(bet.get('home_team')), str(bet.get('away_team')))
+        market = 'h2h' if bet.get('market') in H2H_OUTCOMES else bet.get('market')
+        line = bet.get('line')
+        line = 0.0 if line is None or pd.isna(line) else float(line)
+        groups.append(codes.setdefault((event, market, line), len(codes)))
+    return np.array(groups, dtype=np.int64)
+
+
+def win_intervals(bets, probabilities, groups):
+    """Lays the staked outcomes of each group end to end on [0, 1) and returns their (low, high) bounds.
+
+    A draw u from [0, 1) per group settles it: the bet with low <= u < high
+    wins and every other bet of the group loses; u past the last bound means
+    an unstaked outcome won. Probabilities are rescaled to sum to 1 when a
+    group's outcomes exceed 1 (vigged prices) or make up the whole market
+    (home/draw/away, or both sides of a spread or total line).
+    """
+    markets = ['h2h' if bet.get('market') in H2H_OUTCOMES else bet.get('market') for bet in bets]
+    totals = np.bincount(groups, weights=probabilities)
+    sizes = np.bincount(groups)
+    complete = np.zeros(len(totals), dtype=bool)
+    for group, market in zip(groups, markets):
+        complete[group] = sizes[group] == {'h2h': 3, 'spreads': 2, 'totals': 2}.get(market, 0)
+    scale = np.where(complete | (totals > 1), totals, 1.0)
+    share = probabilities / np.where(scale > 0, scale, 1.0)[groups]
+
+    high = np.empty(len(share))
+    running = np.zeros(len(totals))
+    for i, group in enumerate(groups):
+        running[group] += share[i]
+        high[i] = running[group]
+    return high - share, high
+
+
+def _simulate_chunk(seed, n_paths, n_days, weights, odds, low, high, groups, available_funds, ruin_threshold):
+    """Simulates one chunk of bankroll paths; runs inside a worker process."""
+    rng = np.random.default_rng(seed)
+    # One draw per exclusive group settles all of its bets at once
+    draws = rng.random((n_paths, n_days, int(groups.max()) + 1))[..., groups]
+    wins = (draws >= low) & (draws < high)
+    # Each day the bankroll is split by the recommended stake weights; unstaked funds are kept
+    daily_multiplier = (1 - weights.sum()) + (wins * (weights * odds)).sum(axis=2)
+    bankroll = available_funds * np.cumprod(daily_multiplier, axis=1)
+    ruined = (bankroll < ruin_threshold).any(axis=1)
+    return bankroll[:, -1].astype(np.float32), ruined
+
+
+def simulate_bankroll(bets, available_funds, n_days=30, n_paths=1_000_000, O_fix=None, seed=0,
+                      workers=None, chunk_size=DEFAULT_CHUNK_SIZE, ruin_threshold=1.0):
+    """Monte Carlo estimate of the bankroll after n_days of repeating a recommended slate.
+
+    Every day the bankroll is re-staked on the slate in the same proportions
+    as the recommended stakes of available_funds. Each game settles on a
+    single outcome: bets on mutually exclusive outcomes (see
+    exclusive_groups) share one draw, and bets on different games win
+    independently, each with its de-vigged probability (see
+    bet_probabilities).
+    Paths are simulated in chunks with per-chunk seeds spawned from seed, so
+    results are identical for any number of workers. workers=1 runs in-process.
+
+    Returns a dict with the mean final bankroll, probability of profit, risk of
+    ruin (bankroll falling below ruin_threshold on any day) and percentiles.
+    """
+    bets = [bet for bet in bets if bet.get('stake')]
+    if not bets:
+        return {}
+    odds = np.array([bet['odds'] for bet in bets], dtype=float)
+    weights = np.array([bet['stake'] for bet in bets], dtype=float) / available_funds
+    groups = exclusive_groups(bets)
+    low, high = win_intervals(bets, bet_probabilities(bets, O_fix), groups)
+
+    sizes = [chunk_size] * (n_paths // chunk_size)
+    if n_paths % chunk_size:
+        sizes.append(n_paths % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(s, size, n_days, weights, odds, low, high, groups, available_funds, ruin_threshold)
+            for s, size in zip(seeds, sizes)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(args) == 1:
+        chunks = [_simulate_chunk(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(args))) as executor:
+            chunks = list(executor.map(_simulate_chunk, *zip(*args)))
+
+    final = np.concatenate([chunk[0] for chunk in chunks])
+    ruined = np.concatenate([chunk[1] for chunk in chunks])
+    logging.info(f"Simulated {n_paths} bankroll paths over {n_days} days for {len(bets)} bets.")
+    return {
+        'paths': n_paths,
+        'days': n_days,
+        'mean_final_bankroll': float(final.mean()),
+        'probability_of_profit': float((final > available_funds).mean()),
+        'risk_of_ruin': float(ruined.mean()),
+        'percentiles': dict(zip(PERCENTILES, np.percentile(final, PERCENTILES).round(2).tolist())),
+    }
@@ -0,0 +1,156 @@
+# snapshot_store.py
+
+import logging
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from main import add_fetch_listener, normalize_events
+
+# Root directory of the on-disk odds archive; archiving is off when unset
+ODDS_ARCHIVE_DIR = os.getenv('ODDS_ARCHIVE_DIR', '')
+
+# Columns restored as categoricals when a snapshot is read back
+CATEGORICAL_COLUMNS = ['home_team', 'away_team', 'bookmaker', 'sport_key']
+PARTITIONING = ['poll_date', 'sport_key']
+
+
+def _pyarrow():
+    """Imports pyarrow lazily so the archive stays an optional feature."""
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+    except ImportError as e:
+        raise ImportError("The odds archive requires pyarrow (pip install pyarrow).") from e
+    return pa, ds, fs
+
+
+class SnapshotStore:
+    """Append-only archive of normalized odds polls in Arrow IPC files.
+
+    Every poll is written under <root>/<kind>/poll_date=YYYY-MM-DD/sport_key=<key>/
+    where kind is 'odds' (O_fix) or 'fixtures' (X_fix). Reads memory-map the
+    files and push league, date and bookmaker filters down to the scan, so
+    only the matching partitions and rows are materialized.
+    """
+
+    def __init__(self, root=ODDS_ARCHIVE_DIR):
+        if not root:
+            raise ValueError("SnapshotStore needs a root directory (set ODDS_ARCHIVE_DIR).")
+        self.root = root
+
+    def write(self, X_fix, O_fix, polled_at=None):
+        """Appends one poll of fixtures and odds to the archive."""
+        pa, ds, _ = _pyarrow()
+        polled_at = pd.Timestamp(polled_at or datetime.now(timezone.utc))
+        if polled_at.tzinfo is None:
+            polled_at = polled_at.tz_localize('UTC')
+        stamp = polled_at.strftime('%Y%m%dT%H%M%S%fZ')
+
+        for kind, frame in (('fixtures', X_fix), ('odds', O_fix.reset_index())):
+            if frame.empty:
+                continue
+            frame = frame.copy()
+            for column in frame.columns:
+                if isinstance(frame[column].dtype, pd.CategoricalDtype):
+                    frame[column] = frame[column].astype(str)
+            frame['polled_at'] = polled_at
+            frame['poll_date'] = polled_at.strftime('%Y-%m-%d')
+            ds.write_dataset(
+                pa.Table.from_pandas(frame, preserve_index=False),
+                os.path.join(self.root, kind),
+                format='ipc',
+                partitioning=PARTITIONING,
+                partitioning_flavor='hive',
+                basename_template=f'poll-{stamp}-{{i}}.arrow',
+                existing_data_behavior='overwrite_or_ignore',
+            )
+        logging.info(f"Archived odds snapshot {stamp} ({len(O_fix)} odds rows).")
+
+    def _dataset(self, kind):
+        """Opens one archive kind as a memory-mapped, hive-partitioned dataset."""
+        _, ds, fs = _pyarrow()
+        path = os.path.join(self.root, kind)
+        if not os.path.isdir(path):
+            return None
+        return ds.dataset(path, format='ipc', partitioning='hive',
+                          filesystem=fs.LocalFileSystem(use_mmap=True))
+
+    def _read(self, kind, sport_keys=None, start=None, end=None, bookmakers=None, columns=None):
+        """Scans one archive kind with filters pushed down to partitions and rows."""
+        _, ds, _ = _pyarrow()
+        dataset = self._dataset(kind)
+        if dataset is None:
+            return pd.DataFrame()
+
+        conditions = []
+        if sport_keys is not None:
+            conditions.append(ds.field('sport_key').isin(list(sport_keys)))
+        if start is not None:
+            conditions.append(ds.field('poll_date') >= pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            conditions.append(ds.field('poll_date') <= pd.Timestamp(end).strftime('%Y-%m-%d'))
+        if bookmakers is not None and kind == 'odds':
+            conditions.append(ds.field('bookmaker').isin(list(bookmakers)))
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        frame = dataset.to_table(columns=columns, filter=expression).to_pandas()
+        for column in CATEGORICAL_COLUMNS:
+            if column in frame.columns:
+                frame[column] = frame[column].astype('category')
+        return frame.drop(columns=['poll_date'], errors='ignore')
+
+    def read_odds(self, sport_keys=None, start=None, end=None, bookmakers=None, columns=None):
+        """Reads archived odds rows (one per poll, event and bookmaker) in long history form."""
+        return self._read('odds', sport_keys, start, end, bookmakers, columns)
+
+    def read_fixtures(self, sport_keys=None, start=None, end=None, columns=None):
+        """Reads archived fixture rows (one per poll and event)."""
+        return self._read('fixtures', sport_keys, start, end, columns=columns)
+
+    def latest(self, sport_keys):
+        """Returns (X_fix, O_fix) from the newest archived poll of each league, or None.
+
+        Only the most recent poll_date partition of each league is scanned.
+        """
+        fixtures, odds = [], []
+        for sport_key in sport_keys:
+            league_dir = None
+            odds_root = os.path.join(self.root, 'odds')
+            if os.path.isdir(odds_root):
+                for poll_dir in sorted(os.listdir(odds_root), reverse=True):
+                    candidate = os.path.join(odds_root, poll_dir, f'sport_key={sport_key}')
+                    if os.path.isdir(candidate):
+                        league_dir = poll_dir.split('=', 1)[1]
+                        break
+            if league_dir is None:
+                continue
+            O_day = self._read('odds', [sport_key], start=league_dir, end=league_dir)
+            newest = O_day['polled_at'].max()
+            odds.append(O_day[O_day['polled_at'] == newest])
+            X_day = self._read('fixtures', [sport_key], start=league_dir, end=league_dir)
+            fixtures.append(X_day[X_day['polled_at'] == newest])
+
+        if not odds:
+            return None
+        O_fix = pd.concat(odds, ignore_index=True).drop(columns='polled_at')
+        X_fix = pd.concat(fixtures, ignore_index=True).drop(columns='polled_at')
+        for frame in (X_fix, O_fix):
+            for column in CATEGORICAL_COLUMNS:
+                if column in frame.columns:
+                    frame[column] = frame[column].astype(str).astype('category')
+        O_fix = O_fix.set_index(['date', 'home_team', 'away_team']).sort_index()
+        return X_fix, O_fix
+
+
+def archive_fetches(store):
+    """Archives every successful Odds API fetch into store."""
+    def _archive(sport_key, events):
+        X_fix, O_fix = normalize_events(events)
+        store.write(X_fix, O_fix)
+    add_fetch_listener(_archive)
+    return _archive
@@ -0,0 +1,148 @@
+# team_names.py
+
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+
+import pandas as pd
+
+# Persisted alias table: {sport_key: {normalized alias: canonical name}}
+TEAM_ALIASES_PATH = os.getenv('TEAM_ALIASES_PATH', 'team_aliases.json')
+
+# Minimum thefuzz WRatio score for a fuzzy match to be accepted
+FUZZY_SCORE_CUTOFF = 88
+
+# Tokens that carry no identity and are ignored when matching
+FILLER_TOKENS = {'fc', 'cf', 'afc', 'sc', 'ac', 'the', 'club', 'de', 'and'}
+
+# Namespace holding every team, used when a lookup has no sport_key
+ANY_SPORT = '*'
+
+
+def normalize_team_name(name):
+    """Lowercases, strips accents and punctuation, and drops filler tokens from a team name."""
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    tokens = re.sub(r'[^a-z0-9 ]+', ' ', text.lower()).split()
+    kept = [token for token in tokens if token not in FILLER_TOKENS]
+    return ' '.join(kept or tokens)
+
+
+class TeamNameResolver:
+    """Maps team names from any source onto one canonical spelling per sport.
+
+    Lookups try, in order: the alias table (persisted, and filled by every
+    successful fuzzy match), an exact match on the normalized canonical name,
+    then a fuzzy match restricted to the sport's canonical names that share
+    the same first token, widening to the whole sport only when that block
+    has no match. Ambiguous fuzzy ties are treated as misses. Every answer,
+    including misses, is memoized, so repeated lookups are dictionary hits.
+    """
+
+    def __init__(self, alias_path=TEAM_ALIASES_PATH, score_cutoff=FUZZY_SCORE_CUTOFF):
+        self.alias_path = alias_path
+        self.score_cutoff = score_cutoff
+        self._canonical = {}  # sport_key -> {normalized name: canonical name}
+        self._blocks = {}     # (sport_key, first token) -> [normalized names]
+        self._aliases = {}    # sport_key -> {normalized alias: canonical name}
+        self._misses = set()  # (sport_key, normalized name) with no acceptable match
+        self._lock = threading.Lock()
+        if alias_path and os.path.exists(alias_path):
+            with open(alias_path, encoding='utf-8') as f:
+                self._aliases = json.load(f)
+            logging.info(f"Loaded team aliases for {len(self._aliases)} sports from {alias_path}.")
+
+    def add_teams(self, sport_key, names):
+        """Registers canonical team names for a sport."""
+        with self._lock:
+            for namespace in (sport_key, ANY_SPORT):
+                canonical = self._canonical.setdefault(namespace, {})
+                for name in names:
+                    key = normalize_team_name(name)
+                    if key and key not in canonical:
+                        canonical[key] = name
+                        self._blocks.setdefault((namespace, key.split()[0]), []).append(key)
+            # New canonical names may now match earlier misses
+            self._misses.clear()
+
+    def add_teams_from_fixtures(self, X_fix):
+        """Registers every home and away team of a fixture frame under its sport_key."""
+        for sport_key, group in X_fix.groupby('sport_key', observed=True):
+            names = pd.unique(pd.concat([group['home_team'].astype(str), group['away_team'].astype(str)]))
+            self.add_teams(sport_key, names)
+
+    def add_alias(self, sport_key, alias, canonical):
+        """Records that alias refers to canonical in a sport."""
+        with self._lock:
+            self._aliases.setdefault(sport_key or ANY_SPORT, {})[normalize_team_name(alias)] = canonical
+
+    def resolve(self, name, sport_key=None):
+        """Returns the canonical name for a team, or None when nothing matches well enough."""
+        namespace = sport_key or ANY_SPORT
+        key = normalize_team_name(name)
+        aliases = self._aliases.get(namespace, {})
+        if key in aliases:
+            return aliases[key]
+        canonical = self._canonical.get(namespace, {})
+        if key in canonical:
+            return canonical[key]
+        if not key or (namespace, key) in self._misses:
+            return None
+
+        match = self._fuzzy_match(namespace, key)
+        with self._lock:
+            if match is None:
+                self._misses.add((namespace, key))
+            else:
+                self._aliases.setdefault(namespace, {})[key] = match
+        return match
+
+    def _fuzzy_match(self, namespace, key):
+        """Fuzzy-matches key within its first-token block, then within its sport."""
+        from thefuzz import fuzz, process
+
+        canonical = self._canonical.get(namespace, {})
+        block = self._blocks.get((namespace, key.split()[0]), [])
+        searches = [block]
+        if namespace != ANY_SPORT:
+            searches.append(list(canonical))
+        for choices in searches:
+            if not choices:
+                continue
+            best = process.extractBests(key, choices, scorer=fuzz.WRatio,
+                                        score_cutoff=self.score_cutoff, limit=2)
+            if not best:
+                continue
+            # A tie (e.g. "Manchester" against United and City) is ambiguous
+            if len(best) > 1 and best[0][1] == best[1][1]:
+                return None
+            return canonical[best[0][0]]
+        return None
+
+    def canonicalize(self, frame, columns=('home_team', 'away_team'), sport_key_column='sport_key'):
+        """Returns a copy of frame with team columns mapped to canonical names.
+
+        Each distinct (sport, name) pair is resolved once; names without a
+        match are left unchanged.
+        """
+        frame = frame.copy()
+        sports = frame[sport_key_column].astype(str) if sport_key_column in frame.columns else None
+        for column in columns:
+            names = frame[column].astype(str)
+            pairs = pd.DataFrame({'sport': sports if sports is not None else ANY_SPORT, 'name': names})
+            unique = pairs.drop_duplicates()
+            resolved = [self.resolve(name, sport) or name for sport, name in zip(unique['sport'], unique['name'])]
+            lookup = pd.Series(resolved, index=pd.MultiIndex.from_frame(unique))
+            frame[column] = lookup.reindex(pd.MultiIndex.from_frame(pairs)).to_numpy()
+        return frame
+
+    def save(self, path=None):
+        """Writes the alias table to disk."""
+        path = path or self.alias_path
+        with self._lock:
+            aliases = {sport: dict(table) for sport, table in self._aliases.items()}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(aliases, f, indent=2, sort_keys=True)
+        logging.info(f"Saved team aliases for {len(aliases)} sports to {path}.")
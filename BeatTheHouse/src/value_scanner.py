@@ -0,0 +1,154 @@
+# value_scanner.py
+
+import numpy as np
+import pandas as pd
+
+from main import H2H_OUTCOMES, calculate_implied_probability, widen_prices
+from metrics import timed
+
+GAME_KEYS = ['date', 'home_team', 'away_team']
+
+
+@timed('scan')
+def scan_prices(O_fix):
+    """Compares every bookmaker's price for each game outcome.
+
+    Returns one row per (game, market) with the best available price and the
+    bookmaker offering it, the consensus no-vig probability (the average of each
+    bookmaker's overround-normalized implied probability), the expected value of
+    a unit stake at the best price, the overround of the best prices across the
+    game's outcomes and whether those prices form a sure-bet arbitrage.
+    """
+    O_flat = O_fix.reset_index()
+    prices = O_flat[H2H_OUTCOMES].to_numpy(dtype=float)
+    quoted = prices > 1  # decimal odds at or below 1 can never be a real price
+
+    # Remove each bookmaker's margin; only books quoting every outcome of the
+    # game contribute to the consensus, otherwise their overround is understated.
+    implied = calculate_implied_probability(np.where(quoted, prices, np.nan))
+    n_quoted = quoted.sum(axis=1)
+    game = O_flat.groupby(GAME_KEYS, observed=True, sort=False).ngroup().to_numpy()
+    game_outcomes = pd.Series(n_quoted).groupby(game).transform('max').to_numpy()
+    complete = (n_quoted == game_outcomes) & (n_quoted > 0)
+    book_overround = implied.sum(axis=1)
+    fair = np.divide(implied, book_overround[:, None], out=np.full_like(implied, np.nan),
+                     where=complete[:, None] & quoted)
+
+    long = pd.DataFrame({
+        'game': np.repeat(game, len(H2H_OUTCOMES)),
+        'market': np.tile(H2H_OUTCOMES, len(O_flat)),
+        'bookmaker': np.repeat(O_flat['bookmaker'].astype(str).to_numpy(), len(H2H_OUTCOMES)),
+        'odds': prices.ravel(),
+        'fair_probability': fair.ravel(),
+    })
+    long = long[quoted.ravel()]
+
+    best = (long.sort_values('odds', ascending=False, kind='mergesort')
+                .drop_duplicates(subset=['game', 'market'], keep='first')
+                .set_index(['game', 'market']))
+    consensus = long.groupby(['game', 'market'], sort=False)['fair_probability'].mean()
+
+    scan = best[['bookmaker', 'odds']].join(consensus).reset_index()
+    scan['implied_probability'] = calculate_implied_probability(scan['odds'].to_numpy())
+    scan['expected_value'] = scan['odds'] * scan['fair_probability'] - 1
+    scan['best_overround'] = scan.groupby('game')['implied_probability'].transform('sum')
+    scan['arbitrage'] = scan['best_overround'] < 1
+    # Share of the total stake to place on each outcome to lock in the arbitrage
+    scan['arbitrage_stake_share'] = scan['implied_probability'] / scan['best_overround']
+
+    games = O_flat[GAME_KEYS].drop_duplicates().reset_index(drop=True)
+    scan = games.reindex(scan['game'].to_numpy()).reset_index(drop=True).join(scan.drop(columns='game'))
+    return scan.sort_values(GAME_KEYS + ['market'], kind='mergesort').reset_index(drop=True)
+
+
+@timed('scan')
+def scan_quotes(fixtures, quotes):
+    """Compares every bookmaker's price for each outcome of every market in quotes.
+
+    The quote-level counterpart of scan_prices, covering h2h, spreads,
+    totals and outrights. Prices are only pooled within a line: spreads are
+    keyed by the home team's handicap and totals by their point, so the
+    consensus, the best prices and any arbitrage always refer to the same
+    bet. Returns one row per (event, market, line, outcome) with the columns
+    of scan_prices plus event_id, sport_key, outcome, point and line.
+    """
+    event = quotes['event_id'].cat.codes.to_numpy().astype(np.int64)
+    market = quotes['market'].cat.codes.to_numpy()
+    market_names = quotes['market'].cat.categories
+    outcome = quotes['outcome'].cat.codes.to_numpy()
+    outcome_names = quotes['outcome'].cat.categories
+    prices = widen_prices(quotes['price'].to_numpy())
+    point = widen_prices(quotes['point'].to_numpy())
+
+    # Both sides of a spread share the home team's handicap; a total's sides share its point
+    home = outcome_names.get_indexer(fixtures['home_team'].astype(object))[event]
+    is_spread = market == (market_names.get_loc('spreads') if 'spreads' in market_names else -1)
+    is_total = market == (market_names.get_loc('totals') if 'totals' in market_names else -1)
+    line = np.where(is_spread, np.where(outcome == home, point, -point), np.where(is_total, point, 0.0))
+
+    quoted = prices > 1  # decimal odds at or below 1 can never be a real price
+    long = pd.DataFrame({
+        'event': event,
+        'market': market,
+        'line': np.nan_to_num(line),
+        'outcome': outcome,
+        'bookmaker': quotes['bookmaker'].cat.codes.to_numpy(),
+        'point': point,
+        'odds': prices,
+        'implied': calculate_implied_probability(prices),
+    })[quoted]
+
+    # Remove each bookmaker's margin per line; only books quoting every outcome
+    # of the line contribute to the consensus, as in scan_prices.
+    line_keys = ['event', 'market', 'line']
+    book_line = long.groupby(line_keys + ['bookmaker'], sort=False)
+    n_quoted = book_line['odds'].transform('size')
+    book_overround = book_line['implied'].transform('sum')
+    complete = n_quoted == n_quoted.groupby([long[key] for key in line_keys]).transform('max')
+    long['fair_probability'] = (long['implied'] / book_overround).where(complete)
+
+    keys = line_keys + ['outcome']
+    best = (long.sort_values('odds', ascending=False, kind='mergesort')
+                .drop_duplicates(subset=keys, keep='first')
+                .set_index(keys))
+    consensus = long.groupby(keys, sort=False)['fair_probability'].mean()
+    scan = best[['bookmaker', 'point', 'odds']].join(consensus).reset_index()
+    scan['implied_probability'] = calculate_implied_probability(scan['odds'].to_numpy())
+    scan['expected_value'] = scan['odds'] * scan['fair_probability'] - 1
+    scan['best_overround'] = scan.groupby(line_keys)['implied_probability'].transform('sum')
+    scan['arbitrage'] = scan['best_overround'] < 1
+    scan['arbitrage_stake_share'] = scan['implied_probability'] / scan['best_overround']
+
+    events = fixtures.iloc[scan['event'].to_numpy()].reset_index(drop=True)
+    scan = pd.concat([
+        events[GAME_KEYS + ['event_id', 'sport_key', 'sport']],
+        pd.DataFrame({
+            'market': pd.Categorical.from_codes(scan['market'], dtype=quotes['market'].dtype),
+            'outcome': pd.Categorical.from_codes(scan['outcome'], dtype=quotes['outcome'].dtype),
+            'bookmaker': pd.Categorical.from_codes(scan['bookmaker'], dtype=quotes['bookmaker'].dtype),
+            'line': scan['line'],
+        }),
+        scan.drop(columns=['event', 'market', 'outcome', 'bookmaker', 'line']),
+    ], axis=1)
+    scan = scan.sort_values(['date', 'event_id', 'market', 'line', 'outcome'], kind='mergesort')
+    return scan.reset_index(drop=True)
+
+
+def find_value_bets(scan, min_edge=0.0):
+    """Returns outcomes whose best price beats the consensus no-vig price by more than min_edge."""
+    value = scan[scan['expected_value'] > min_edge]
+    return value.sort_values('expected_value', ascending=False, kind='mergesort').reset_index(drop=True)
+
+
+def find_arbitrage(scan, total_funds=None):
+    """Returns the outcomes of games whose best prices form a sure-bet arbitrage.
+
+    When total_funds is given, adds the stake for each outcome and the
+    guaranteed profit of the game.
+    """
+    arbs = scan[scan['arbitrage']].copy()
+    arbs['guaranteed_return'] = 1 / arbs['best_overround'] - 1
+    if total_funds is not None:
+        arbs['stake'] = (arbs['arbitrage_stake_share'] * total_funds).round(2)
+        arbs['guaranteed_profit'] = (arbs['guaranteed_return'] * total_funds).round(2)
+    return arbs.sort_values('guaranteed_return', ascending=False, kind='mergesort').reset_index(drop=True)
@@ -0,0 +1,104 @@
+# conftest.py
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+# The application modules are flat scripts under src/ that import each other by name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+
+def stub_event(sport_key, hours_ahead=3, price=2.0):
+    """Returns one upcoming h2h event of sport_key as the Odds API lists it."""
+    commence = datetime.now(timezone.utc) + timedelta(hours=hours_ahead)
+    home, away = f'{sport_key} Home', f'{sport_key} Away'
+    return {
+        'id': f'{sport_key}-1', 'sport_key': sport_key, 'sport_title': sport_key,
+        'commence_time': commence.strftime('%Y-%m-%dT%H:%M:%SZ'), 'home_team': home, 'away_team': away,
+        'bookmakers': [{'key': 'pinnacle', 'title': 'Pinnacle', 'last_update': '2024-01-01T10:00:00Z',
+                        'markets': [{'key': 'h2h', 'outcomes': [{'name': home, 'price': price},
+                                                                {'name': away, 'price': price}]}]}],
+    }
+
+
+class OddsApiStub:
+    """Local stand-in for the Odds API that charges credits and can answer with an error status.
+
+    Each request costs one credit per region per market, reported in the
+    x-requests-* headers like the real API. events maps a sport_key to its
+    event list (default: one upcoming game); requests records the sport_key
+    of every request in arrival order.
+    """
+
+    def __init__(self, remaining=500):
+        self.remaining = remaining
+        self.used = 0
+        self.status = 200
+        self.retry_after = None
+        self.delay = 0.0
+        self.events = {}
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def respond(self, handler):
+        url = urlparse(handler.path)
+        sport_key = url.path.split('/')[3]
+        query = parse_qs(url.query)
+        with self._lock:
+            self.requests.append(sport_key)
+        time.sleep(self.delay)
+        if self.status != 200:
+            handler.send_response(self.status)
+            if self.retry_after is not None:
+                handler.send_header('Retry-After', str(self.retry_after))
+            handler.end_headers()
+            handler.wfile.write(b'{"message": "stub error"}')
+            return
+        cost = len(query['regions'][0].split(',')) * len(query['markets'][0].split(','))
+        with self._lock:
+            self.remaining -= cost
+            self.used += cost
+            headers = {'x-requests-remaining': self.remaining, 'x-requests-used': self.used, 'x-requests-last': cost}
+        body = json.dumps(self.events.get(sport_key, [stub_event(sport_key)])).encode('utf-8')
+        handler.send_response(200)
+        for name, value in headers.items():
+            handler.send_header(name, str(value))
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+@pytest.fixture
+def odds_api(monkeypatch):
+    """Points the Odds API client at a local OddsApiStub with a fresh cache, quota and host backoff."""
+    import main
+    from odds_cache import OddsCache
+    from quota import QuotaTracker
+
+    stub = OddsApiStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            stub.respond(self)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+    monkeypatch.setattr(main, 'ODDS_API_BASE_URL', base_url)
+    monkeypatch.setattr(main, 'ODDS_API_URL', base_url + '/v4/sports/{sport_key}/odds/')
+    monkeypatch.setattr(main, 'odds_cache', OddsCache(ttl=60))
+    monkeypatch.setattr(main, 'quota', QuotaTracker())
+    monkeypatch.setattr(main, '_host_backoff_until', {})
+    yield stub
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,42 @@
+# test_fetch.py
+
+import threading
+import time
+
+import main
+
+LEAGUES = ['soccer_epl', 'soccer_spain_la_liga', 'basketball_nba']
+
+
+def test_rate_limited_leagues_are_requested_once_per_attempt(odds_api):
+    odds_api.status = 429
+    odds_api.retry_after = 0
+    events, failures = main.fetch_events_for_leagues(LEAGUES)
+    assert events == []
+    assert set(failures) == set(LEAGUES)
+    assert len(odds_api.requests) == len(LEAGUES) * main.BULK_FETCH_MAX_ATTEMPTS
+
+
+def test_backoff_waits_for_retry_after(odds_api, monkeypatch):
+    odds_api.status = 429
+    odds_api.retry_after = 7
+    waits, sleep = [], time.sleep
+
+    def record(seconds):
+        # Only the fetch workers' backoff; the stub server keeps sleeping for real
+        if threading.current_thread().name.startswith('odds-fetch'):
+            waits.append(seconds)
+        else:
+            sleep(seconds)
+    monkeypatch.setattr(time, 'sleep', record)
+    _, failures = main.fetch_events_for_leagues(['soccer_epl'])
+    assert set(failures) == {'soccer_epl'}
+    assert len(waits) == main.BULK_FETCH_MAX_ATTEMPTS - 1
+    assert all(6 < wait <= 7 for wait in waits)
+
+
+def test_bulk_fetch_requests_each_league_once(odds_api):
+    events, failures = main.fetch_events_for_leagues(LEAGUES)
+    assert failures == {}
+    assert [event['sport_key'] for event in events] == LEAGUES
+    assert sorted(odds_api.requests) == sorted(LEAGUES)
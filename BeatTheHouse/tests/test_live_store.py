@@ -0,0 +1,42 @@
+# test_live_store.py
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from conftest import stub_event
+from ingest_worker import IngestWorker
+from live_store import LiveSnapshotStore
+from main import normalize_quotes
+from scheduler import PollScheduler
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LiveSnapshotStore(str(tmp_path))
+
+
+def test_published_snapshot_is_read_back(store):
+    fixtures, quotes = normalize_quotes([stub_event('soccer_epl')])
+    version = store.publish('soccer_epl', fixtures, quotes, markets='h2h')
+    read = store.read_many(['soccer_epl'], {'soccer_epl': 'h2h'})
+    assert read[0] == (version,)
+    assert list(read[1]['event_id']) == ['soccer_epl-1']
+    assert len(read[2]) == len(quotes)
+
+
+def test_snapshot_without_a_selected_market_is_unpublished(store):
+    fixtures, quotes = normalize_quotes([stub_event('soccer_epl')])
+    store.publish('soccer_epl', fixtures, quotes, markets='h2h')
+    assert store.versions(['soccer_epl'], {'soccer_epl': 'h2h,spreads'}) == (None,)
+    assert store.read_many(['soccer_epl'], {'soccer_epl': 'h2h,spreads'}) is None
+    assert store.versions(['soccer_epl']) == (1,)
+
+
+def test_worker_records_the_markets_each_league_was_polled_for(store):
+    scheduler = PollScheduler(['soccer_epl', 'soccer_fifa_world_cup_winner'], markets='h2h,spreads')
+    worker = IngestWorker(store, scheduler)
+    worker.publish('soccer_epl', [stub_event('soccer_epl')])
+    worker.publish('soccer_fifa_world_cup_winner', [])
+    assert store.manifest('soccer_epl')['markets'] == 'h2h,spreads'
+    assert store.manifest('soccer_fifa_world_cup_winner')['markets'] == 'outrights'
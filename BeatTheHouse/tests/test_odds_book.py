@@ -0,0 +1,150 @@
+# test_odds_book.py
+
+import copy
+
+import numpy as np
+import pytest
+
+from main import best_bet_per_game, normalize_events
+from odds_book import OddsBook
+
+
+def bookmaker(key, home, draw, away, last_update='2024-01-01T10:00:00Z'):
+    return {'key': key, 'title': key, 'last_update': last_update, 'markets': [{'key': 'h2h', 'outcomes': [
+        {'name': 'Home', 'price': home}, {'name': 'Away', 'price': away}, {'name': 'Draw', 'price': draw}]}]}
+
+
+def event(event_id, bookmakers, sport_key='soccer_epl'):
+    """Builds an Odds API event; bookmaker outcome names are rewritten to the event's own team names."""
+    home, away = f'{event_id} Home', f'{event_id} Away'
+    for book in bookmakers:
+        for outcome in book['markets'][0]['outcomes']:
+            outcome['name'] = {'Home': home, 'Away': away}.get(outcome['name'], outcome['name'])
+    return {'id': event_id, 'sport_key': sport_key, 'sport_title': sport_key, 'commence_time': '2024-01-02T15:00:00Z',
+            'home_team': home, 'away_team': away, 'bookmakers': bookmakers}
+
+
+@pytest.fixture
+def events():
+    return [
+        event('e1', [bookmaker('pinnacle', 2.0, 3.5, 4.0), bookmaker('betfair_ex_uk', 2.1, 3.4, 3.9)]),
+        event('e2', [bookmaker('pinnacle', 1.5, 4.0, 6.0)]),
+        event('n1', [bookmaker('pinnacle', 1.9, 15.0, 2.0)], sport_key='basketball_nba'),
+    ]
+
+
+def apply(book, events):
+    return book.apply(normalize_events(events)[1])
+
+
+def test_first_poll_lists_every_price(events):
+    book = OddsBook()
+    changes = apply(book, events)
+    assert len(book) == 4
+    assert len(changes) == 12
+    assert changes['old_odds'].isna().all()
+    assert book.version == 1
+
+
+def test_unchanged_poll_has_no_changes(events):
+    book = OddsBook()
+    apply(book, events)
+    changes = apply(book, copy.deepcopy(events))
+    assert changes.empty
+    assert book.version == 1
+
+
+def test_price_move_is_reported(events):
+    book = OddsBook()
+    apply(book, events)
+    events[0] = event('e1', [bookmaker('pinnacle', 1.8, 3.5, 4.0, last_update='2024-01-01T11:00:00Z'),
+                             events[0]['bookmakers'][1]])
+    changes = apply(book, events)
+    assert changes[['event_id', 'bookmaker', 'market', 'old_odds', 'new_odds']].values.tolist() == [
+        ['e1', 'pinnacle', 'home_win', 2.0, 1.8]]
+    assert book.version == 2
+
+
+def test_stale_update_is_ignored(events):
+    book = OddsBook()
+    apply(book, events)
+    events[0] = event('e1', [bookmaker('pinnacle', 1.8, 3.5, 4.0, last_update='2024-01-01T09:00:00Z'),
+                             events[0]['bookmakers'][1]])
+    assert apply(book, events).empty
+
+
+def test_bookmaker_pulled_from_listed_event_is_removed(events):
+    book = OddsBook()
+    apply(book, events)
+    events[0]['bookmakers'] = events[0]['bookmakers'][:1]
+    changes = apply(book, events)
+    assert len(book) == 3
+    assert set(changes['bookmaker']) == {'betfair_ex_uk'}
+    assert sorted(changes['market']) == ['away_win', 'draw', 'home_win']
+    assert changes['new_odds'].isna().all()
+    np.testing.assert_allclose(sorted(changes['old_odds']), [2.1, 3.4, 3.9])
+    assert 'betfair_ex_uk' not in set(book.frame()['bookmaker'].astype(str))
+
+
+def test_finished_event_is_removed(events):
+    book = OddsBook()
+    apply(book, events)
+    changes = apply(book, events[1:])
+    assert len(book) == 2
+    assert set(changes['event_id']) == {'e1'}
+    assert len(changes) == 6
+    assert 'e1' not in set(book.best_bets()['event_id'])
+
+
+def test_other_leagues_are_not_pruned(events):
+    book = OddsBook()
+    apply(book, events)
+    changes = apply(book, events[:2])
+    assert changes.empty
+    assert len(book) == 4
+
+
+def test_polled_league_without_events_is_pruned(events):
+    book = OddsBook()
+    apply(book, events)
+    changes = book.apply(normalize_events(events[:2])[1], polled=['soccer_epl', 'basketball_nba'])
+    assert set(changes['event_id']) == {'n1'}
+    assert changes['new_odds'].isna().all()
+    assert len(book) == 3
+    assert 'n1' not in set(book.best_bets()['event_id'])
+
+
+def test_empty_poll_prunes_the_polled_league(events):
+    book = OddsBook()
+    apply(book, events)
+    book.apply(normalize_events([])[1], polled=['soccer_epl'])
+    assert len(book) == 1
+
+
+def test_prune_disabled_keeps_missing_rows(events):
+    book = OddsBook()
+    apply(book, events)
+    events[0]['bookmakers'] = events[0]['bookmakers'][:1]
+    assert book.apply(normalize_events(events)[1], prune=False).empty
+    assert len(book) == 4
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_best_bets_order_ignores_polling_history(seed):
+    rng = np.random.default_rng(seed)
+    names = ['pinnacle', 'betfair_ex_uk', 'williamhill']
+    # Few distinct prices, so games and bookmakers tie on odds
+    games = [event(f'g{i}', [bookmaker(name, *rng.choice([1.5, 2.0, 3.0], size=3)) for name in names])
+             for i in range(6)]
+    book = OddsBook()
+    for _ in range(4):
+        polled = [games[i] for i in rng.permutation(len(games))[:rng.integers(1, len(games) + 1)]]
+        book.apply(normalize_events(copy.deepcopy(polled))[1], prune=False)
+    apply(book, copy.deepcopy(games))
+    fresh = OddsBook()
+    apply(fresh, copy.deepcopy(games))
+
+    columns = ['event_id', 'bookmaker', 'market', 'odds']
+    expected = best_bet_per_game(normalize_events(copy.deepcopy(games))[1])[columns].astype(object)
+    for bets in (book.best_bets(), fresh.best_bets()):
+        assert bets[columns].astype(object).values.tolist() == expected.values.tolist()
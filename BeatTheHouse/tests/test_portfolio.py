@@ -0,0 +1,112 @@
+# test_portfolio.py
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio import exclusive_kelly, kelly_portfolio, round_to_cents
+
+
+def reference_kelly(probability, odds):
+    """Smoczynski-Tomkins for one group of exclusive outcomes, one outcome at a time."""
+    fractions = np.zeros(len(odds))
+    order = sorted((i for i in range(len(odds)) if probability[i] > 0 and odds[i] > 1),
+                   key=lambda i: -probability[i] * odds[i])
+    taken, reserve, sum_p, sum_inv = [], 1.0, 0.0, 0.0
+    for i in order:
+        if probability[i] * odds[i] <= reserve or sum_inv + 1 / odds[i] >= 1:
+            break
+        taken.append(i)
+        sum_p += probability[i]
+        sum_inv += 1 / odds[i]
+        reserve = (1 - sum_p) / (1 - sum_inv)
+    for i in taken:
+        fractions[i] = max(probability[i] - reserve / odds[i], 0.0)
+    return fractions
+
+
+def random_groups(rng, n_groups):
+    """Returns (probability, odds, group) for n_groups markets of 1-8 outcomes with noisy margins."""
+    probability, odds, group = [], [], []
+    for g in range(n_groups):
+        size = int(rng.integers(1, 9))
+        p = rng.dirichlet(np.ones(size)) * rng.uniform(0.7, 1.0)
+        o = 1 / (p * rng.uniform(0.85, 1.15, size))
+        probability.extend(p)
+        odds.extend(o)
+        group.extend([g] * size)
+    order = rng.permutation(len(group))
+    return np.array(probability)[order], np.array(odds)[order], np.array(group)[order]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_exclusive_kelly_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    probability, odds, group = random_groups(rng, 50)
+    fractions = exclusive_kelly(probability, odds, group)
+    for g in np.unique(group):
+        members = group == g
+        np.testing.assert_allclose(fractions[members], reference_kelly(probability[members], odds[members]),
+                                   atol=1e-12)
+
+
+def test_exclusive_kelly_single_bet_is_classic_kelly():
+    fractions = exclusive_kelly([0.6], [2.0], [0])
+    np.testing.assert_allclose(fractions, [0.2])
+
+
+def test_exclusive_kelly_ignores_invalid_outcomes():
+    fractions = exclusive_kelly([np.nan, 0.6, 0.0, 0.5], [3.0, 2.0, 5.0, 1.0], [0, 1, 2, 3])
+    np.testing.assert_array_equal(fractions[[0, 2, 3]], 0.0)
+    assert fractions[1] > 0
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_round_to_cents_sums_to_total(seed):
+    rng = np.random.default_rng(seed)
+    amounts = rng.uniform(0, 50, int(rng.integers(1, 30)))
+    total = round(float(rng.uniform(0.5, 1.5) * amounts.sum()), 2)
+    rounded = round_to_cents(amounts, total)
+    assert int(np.round(rounded * 100).sum()) == int(round(total * 100))
+    assert (rounded >= 0).all()
+
+
+def test_round_to_cents_own_total_stays_within_a_cent():
+    amounts = np.array([33.333, 33.333, 33.334, 0.004])
+    rounded = round_to_cents(amounts)
+    assert int(np.round(rounded * 100).sum()) == int(round(amounts.sum() * 100))
+    assert (np.abs(rounded - amounts) < 0.01 + 1e-9).all()
+
+
+def test_round_to_cents_negative_leftover():
+    # Floored cents add up to 6.00, so a 5.97 total takes three cents back
+    rounded = round_to_cents([1.005, 2.005, 3.005], 5.97)
+    assert int(np.round(rounded * 100).sum()) == 597
+    assert (rounded >= 0).all()
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_round_to_cents_near_sum_moves_each_amount_by_under_two_cents(seed):
+    rng = np.random.default_rng(seed)
+    amounts = rng.uniform(0, 50, int(rng.integers(1, 30)))
+    total = round(float(amounts.sum()) + int(rng.integers(-3, 4)) / 100, 2)
+    rounded = round_to_cents(amounts, total)
+    assert int(np.round(rounded * 100).sum()) == int(round(total * 100))
+    assert (np.abs(rounded - amounts) < 0.02).all()
+
+
+def test_round_to_cents_negative_leftover_skips_zero_amounts():
+    rounded = round_to_cents([0.0, 0.001, 2.0, 3.0], 4.99)
+    assert int(np.round(rounded * 100).sum()) == 499
+    assert (rounded >= 0).all()
+
+
+def test_kelly_portfolio_respects_limits():
+    rng = np.random.default_rng(0)
+    probability, odds, group = random_groups(rng, 40)
+    bets = pd.DataFrame({'event': group, 'market': 'h2h', 'odds': odds, 'fair_probability': probability})
+    picked = kelly_portfolio(bets, 100.0, 6, ['event'], ['event', 'market'], max_stake_fraction=0.25)
+    assert 0 < len(picked) <= 6
+    assert picked['stake'].sum() <= 100.0 + 1e-9
+    assert (picked['stake'] <= 25.0 + 1e-9).all()
+    np.testing.assert_allclose(picked['stake'] * 100, np.round(picked['stake'] * 100), atol=1e-6)
@@ -0,0 +1,112 @@
+# test_scheduler.py
+
+import math
+import threading
+import time
+
+import main
+from scheduler import PollScheduler
+
+
+class FakeClock:
+    """Clock whose sleep() advances time instantly."""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        assert math.isfinite(seconds)
+        self.now += seconds
+
+
+def scheduler(sport_keys, clock, reserve=50):
+    # h2h across three regions costs 3 credits per poll
+    return PollScheduler(sport_keys, base_interval=60, reset_at=clock.now + 86_400, reserve=reserve,
+                         quota_tracker=main.quota, clock=clock)
+
+
+def test_polls_stop_at_the_reserve(odds_api):
+    odds_api.remaining = 100
+    clock = FakeClock()
+    polls = scheduler(['soccer_epl'], clock)
+    polled = []
+    polls.run(polls=16, on_events=lambda key, events: polled.append(key), sleep=clock.sleep)
+    # Polls run while a 3-credit request keeps at least 50 credits: 100 -> 52
+    assert len(polled) == 16
+    assert main.quota.remaining == 52
+    polls.run(polls=1, on_events=lambda key, events: polled.append(key), sleep=clock.sleep)
+    assert len(odds_api.requests) == 16
+    assert len(polled) == 16
+    due, _ = polls.next_due()
+    assert due >= polls.reset_at
+
+
+def test_poll_landing_on_the_reserve_waits_for_the_reset(odds_api):
+    odds_api.remaining = 56
+    clock = FakeClock()
+    polls = scheduler(['soccer_epl'], clock)
+    polls.run_once()
+    polls.run_once()
+    # 56 -> 53 -> 50: the second poll lands exactly on the reserve
+    assert main.quota.remaining == 50
+    assert math.isfinite(polls.budget_scale())
+    assert polls.next_due() == (polls.reset_at, 'soccer_epl')
+    polls.run(polls=1, sleep=clock.sleep)
+    assert len(odds_api.requests) == 2
+
+
+def test_exhausted_quota_pauses_every_league(odds_api):
+    odds_api.remaining = 60
+    clock = FakeClock()
+    polls = scheduler(['soccer_epl', 'soccer_spain_la_liga', 'basketball_nba'], clock)
+    polls.run(polls=10, sleep=clock.sleep)
+    assert len(odds_api.requests) == 3
+    assert main.quota.remaining == 51
+    assert all(due >= polls.reset_at for due, _, _ in polls._queue)
+    assert len(polls._queue) == 3
+
+
+def test_failed_poll_is_retried_with_backoff(odds_api):
+    odds_api.remaining = 100_000
+    odds_api.status = 401
+    clock = FakeClock()
+    polls = scheduler(['soccer_epl'], clock)
+    assert polls.run_once() == ('soccer_epl', None)
+    assert polls.next_due() == (clock.now + 60, 'soccer_epl')
+    clock.now += 60
+    polls.run_once()
+    assert polls.next_due() == (clock.now + 120, 'soccer_epl')
+    odds_api.status = 200
+    clock.now += 120
+    sport_key, events = polls.run_once()
+    assert len(events) == 1
+    # The next game is 3 hours away, so the league is polled every 3 base intervals
+    assert polls.next_due() == (clock.now + 180, 'soccer_epl')
+
+
+def test_concurrent_loads_share_one_request(odds_api):
+    odds_api.delay = 0.3
+    results = []
+
+    def load():
+        results.append(main.fetch_upcoming_events('soccer_epl', use_cache=False))
+
+    threads = [threading.Thread(target=load) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert odds_api.requests == ['soccer_epl']
+    assert len(results) == 5
+    assert all(result == results[0] for result in results)
+
+
+def test_cached_reads_do_not_refetch(odds_api):
+    first = main.fetch_upcoming_events('soccer_epl')
+    assert main.fetch_upcoming_events('soccer_epl') == first
+    assert odds_api.requests == ['soccer_epl']
+    main.fetch_upcoming_events('soccer_epl', use_cache=False)
+    assert odds_api.requests == ['soccer_epl', 'soccer_epl']
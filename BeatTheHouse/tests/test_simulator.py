@@ -0,0 +1,65 @@
+# test_simulator.py
+
+import numpy as np
+import pytest
+
+from simulator import exclusive_groups, simulate_bankroll, win_intervals
+
+
+def bet(event_id, market, odds, stake, probability, line=None):
+    return {'event_id': event_id, 'date': '2024-01-02', 'home_team': f'{event_id} Home',
+            'away_team': f'{event_id} Away', 'market': market, 'line': line, 'odds': odds, 'stake': stake,
+            'fair_probability': probability}
+
+
+@pytest.fixture
+def slate():
+    return [
+        bet('e1', 'home_win', 2.0, 20.0, 0.5),
+        bet('e1', 'draw', 4.0, 10.0, 0.25),
+        bet('e1', 'away_win', 4.0, 10.0, 0.25),
+        bet('e2', 'home_win', 1.8, 30.0, 0.55),
+        bet('e3', 'spreads', 1.9, 10.0, 0.5, line=-1.5),
+    ]
+
+
+def test_same_seed_gives_identical_results_for_any_worker_count(slate):
+    runs = [simulate_bankroll(slate, 100.0, n_days=10, n_paths=4000, seed=7, workers=workers, chunk_size=1000)
+            for workers in (1, 2, 4)]
+    assert runs[0] == runs[1] == runs[2]
+    assert simulate_bankroll(slate, 100.0, n_days=10, n_paths=4000, seed=8, workers=1, chunk_size=1000) != runs[0]
+
+
+def test_exclusive_groups_follow_game_market_and_line(slate):
+    slate.append(bet('e3', 'spreads', 1.9, 10.0, 0.5, line=-2.5))
+    # The away side of the -1.5 spread carries the same (home) line
+    slate.append(bet('e3', 'spreads', 1.9, 10.0, 0.5, line=-1.5))
+    assert exclusive_groups(slate).tolist() == [0, 0, 0, 1, 2, 3, 2]
+
+
+def test_each_game_settles_on_exactly_one_outcome(slate):
+    groups = exclusive_groups(slate)
+    low, high = win_intervals(slate, np.array([b['fair_probability'] for b in slate]), groups)
+    draws = np.linspace(0, 1, 10001, endpoint=False)[:, None]
+    wins = (draws >= low) & (draws < high)
+    # Home, draw and away make up the whole market, so one of them always wins
+    assert (wins[:, groups == 0].sum(axis=1) == 1).all()
+    assert wins[:, groups == 0].mean(axis=0) == pytest.approx([0.5, 0.25, 0.25], abs=1e-3)
+    assert (wins[:, groups == 1].sum(axis=1) <= 1).all()
+
+
+def test_fair_stakes_on_every_outcome_keep_the_bankroll_flat(slate):
+    # Staked in proportion to fair probabilities, whichever outcome wins pays back exactly the stakes
+    result = simulate_bankroll(slate[:3], 40.0, n_days=20, n_paths=5000, workers=1)
+    assert result['mean_final_bankroll'] == pytest.approx(40.0)
+    assert result['risk_of_ruin'] == 0.0
+    assert set(result['percentiles'].values()) == {40.0}
+
+
+def test_risk_of_ruin_matches_closed_form_for_one_bet():
+    # All-in on one bet each day: a single loss ruins, so ruin = 1 - p ** n_days
+    p, n_days = 0.6, 5
+    result = simulate_bankroll([bet('e1', 'home_win', 2.0, 100.0, p)], 100.0, n_days=n_days,
+                               n_paths=200_000, workers=1)
+    assert result['risk_of_ruin'] == pytest.approx(1 - p ** n_days, abs=0.005)
+    assert result['probability_of_profit'] == pytest.approx(p ** n_days, abs=0.005)